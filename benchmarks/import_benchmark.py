@@ -0,0 +1,47 @@
+'''
+//  -------------------------------------------------------------
+//  author        Giga
+//  project       qeeqbox/honeypots
+//  email         gigaqeeq@gmail.com
+//  description   import_benchmark.py (benchmark)
+//  licensee      AGPL-3.0
+//  -------------------------------------------------------------
+//  contributors list qeeqbox/honeypots/graphs/contributors
+//  -------------------------------------------------------------
+'''
+
+from argparse import ArgumentParser
+from os import path
+from subprocess import run, PIPE
+from sys import executable
+from time import perf_counter
+
+all_servers = ['QDNSServer', 'QFTPServer', 'QHTTPProxyServer', 'QHTTPServer', 'QHTTPSServer', 'QIMAPServer', 'QMysqlServer', 'QPOP3Server', 'QPostgresServer', 'QRedisServer', 'QSMBServer', 'QSMTPServer', 'QSOCKS5Server', 'QSSHServer', 'QTelnetServer', 'QVNCServer', 'QElasticServer', 'QMSSQLServer', 'QLDAPServer', 'QNTPServer', 'QMemcacheServer', 'QOracleServer', 'QSNMPServer']
+repository = path.dirname(path.dirname(path.abspath(__file__)))
+import_code = 'from time import perf_counter\nstart = perf_counter()\nfrom honeypots import {}\nprint(perf_counter() - start)'
+
+
+def measure(name, runs):
+    imports, processes = [], []
+    for _ in range(runs):
+        start = perf_counter()
+        result = run([executable, '-c', import_code.format(name)], stdout=PIPE, stderr=PIPE, check=True, cwd=repository)
+        processes.append(perf_counter() - start)
+        imports.append(float(result.stdout.decode().split()[-1]))
+    imports.sort()
+    processes.sort()
+    return imports[len(imports) // 2] * 1e3, processes[len(processes) // 2] * 1e3
+
+
+def main():
+    parser = ArgumentParser(description='Measure the cold import time of each honeypot in a fresh interpreter')
+    parser.add_argument('--honeypots', default=','.join(all_servers), help='comma separated honeypot classes to measure, use package to import everything')
+    parser.add_argument('--runs', type=int, default=5, help='fresh interpreters per honeypot, the median is reported')
+    args = parser.parse_args()
+    print('{:<18} {:>12} {:>12}'.format('honeypot', 'import ms', 'process ms'))
+    for name in args.honeypots.split(','):
+        print('{:<18} {:>12.1f} {:>12.1f}'.format(name, *measure('*' if name == 'package' else name, args.runs)))
+
+
+if __name__ == '__main__':
+    main()
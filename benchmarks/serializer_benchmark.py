@@ -0,0 +1,68 @@
+'''
+//  -------------------------------------------------------------
+//  author        Giga
+//  project       qeeqbox/honeypots
+//  email         gigaqeeq@gmail.com
+//  description   serializer_benchmark.py (benchmark)
+//  licensee      AGPL-3.0
+//  -------------------------------------------------------------
+//  contributors list qeeqbox/honeypots/graphs/contributors
+//  -------------------------------------------------------------
+'''
+
+from argparse import ArgumentParser
+from collections.abc import Mapping
+from json import JSONEncoder, dumps
+from timeit import repeat
+from os import path
+from sys import path as sys_path
+sys_path.insert(0, path.dirname(path.dirname(path.abspath(__file__))))
+from honeypots.helper import serialize_event
+
+
+class LegacyEncoder(JSONEncoder):
+    def default(self, obj):
+        return repr(obj).replace('\x00', ' ')
+
+
+def legacy_serialize_object(_dict):
+    if isinstance(_dict, Mapping):
+        return dict((k, legacy_serialize_object(v)) for k, v in _dict.items())
+    elif isinstance(_dict, list):
+        return list(legacy_serialize_object(v) for v in _dict)
+    elif isinstance(_dict, (int, float)):
+        return str(_dict)
+    elif isinstance(_dict, str):
+        return _dict.replace('\x00', ' ')
+    elif isinstance(_dict, bytes):
+        return _dict.decode('utf-8', 'ignore').replace('\x00', ' ')
+    else:
+        return repr(_dict).replace('\x00', ' ')
+
+
+def legacy_serialize(obj):
+    return dumps(legacy_serialize_object(obj), sort_keys=True, cls=LegacyEncoder)
+
+
+events = {
+    'connection': {'server': 'telnet_server', 'action': 'connection', 'ip': '203.0.113.7', 'port': 51234},
+    'login': {'server': 'ssh_server', 'action': 'login', 'status': 'failed', 'ip': '203.0.113.7', 'port': 51234, 'username': 'root', 'password': 'admin\x00'},
+    'http': {'server': 'http_server', 'action': 'get', 'ip': '203.0.113.7', 'port': 51234, 'request': {'uri': b'/index.php?id=1', 'version': b'HTTP/1.1', 'headers': {'host': 'example.com', 'user-agent': 'Mozilla/5.0 (compatible; scanner/1.0)', 'accept': '*/*', 'accept-encoding': 'gzip, deflate', 'connection': 'close'}}},
+    'sniffer': {'action': 'sniffer', 'src_ip': '203.0.113.7', 'src_port': 51234, 'dst_ip': '198.51.100.2', 'dst_port': 22, 'raw_payload': b'\x00\x01\x02SSH-2.0-libssh\r\n' * 8, 'payload': ('00010253' * 64)},
+}
+
+
+def main():
+    parser = ArgumentParser(description='Compare the legacy serialize_object + ComplexEncoder path with serialize_event')
+    parser.add_argument('--number', type=int, default=20000, help='calls per round')
+    parser.add_argument('--repeat', type=int, default=5, help='rounds, the best one is reported')
+    args = parser.parse_args()
+    print('{:<12} {:>14} {:>14} {:>8}'.format('event', 'legacy us/op', 'event us/op', 'speedup'))
+    for name, event in events.items():
+        legacy = min(repeat(lambda: legacy_serialize(event), number=args.number, repeat=args.repeat)) / args.number * 1e6
+        current = min(repeat(lambda: serialize_event(event, sort_keys=True), number=args.number, repeat=args.repeat)) / args.number * 1e6
+        print('{:<12} {:>14.2f} {:>14.2f} {:>7.1f}x'.format(name, legacy, current, legacy / current))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,27 +1,52 @@
 #!/usr/bin/env python
-from .__main__ import main_logic
-from .dns_server import QDNSServer
-from .ftp_server import QFTPServer
-from .http_proxy_server import QHTTPProxyServer
-from .http_server import QHTTPServer
-from .https_server import QHTTPSServer
-from .smb_server import QSMBServer
-from .smtp_server import QSMTPServer
-from .ssh_server import QSSHServer
-from .telnet_server import QTelnetServer
-from .pop3_server import QPOP3Server
-from .socks5_server import QSOCKS5Server
-from .postgres_server import QPostgresServer
-from .imap_server import QIMAPServer
-from .redis_server import QRedisServer
-from .mysql_server import QMysqlServer
-from .mssql_server import QMSSQLServer
-from .elastic_server import QElasticServer
-from .vnc_server import QVNCServer
-from .qbsniffer import QBSniffer
-from .ldap_server import QLDAPServer
-from .ntp_server import QNTPServer
-from .memcache_server import QMemcacheServer
-from .oracle_server import QOracleServer
-from .snmp_server import QSNMPServer
-from .helper import server_arguments, clean_all, kill_servers, get_free_port, close_port_wrapper, kill_server_wrapper, setup_logger, disable_logger, postgres_class, get_running_servers, set_local_vars
+from importlib import import_module
+from sys import version_info
+
+lazy_imports = {
+    'main_logic': '__main__',
+    'QDNSServer': 'dns_server',
+    'QFTPServer': 'ftp_server',
+    'QHTTPProxyServer': 'http_proxy_server',
+    'QHTTPServer': 'http_server',
+    'QHTTPSServer': 'https_server',
+    'QSMBServer': 'smb_server',
+    'QSMTPServer': 'smtp_server',
+    'QSSHServer': 'ssh_server',
+    'QTelnetServer': 'telnet_server',
+    'QPOP3Server': 'pop3_server',
+    'QSOCKS5Server': 'socks5_server',
+    'QPostgresServer': 'postgres_server',
+    'QIMAPServer': 'imap_server',
+    'QRedisServer': 'redis_server',
+    'QMysqlServer': 'mysql_server',
+    'QMSSQLServer': 'mssql_server',
+    'QElasticServer': 'elastic_server',
+    'QVNCServer': 'vnc_server',
+    'QBSniffer': 'qbsniffer',
+    'QLDAPServer': 'ldap_server',
+    'QNTPServer': 'ntp_server',
+    'QMemcacheServer': 'memcache_server',
+    'QOracleServer': 'oracle_server',
+    'QSNMPServer': 'snmp_server',
+    'QLogCollector': 'log_collector',
+}
+lazy_imports.update(dict.fromkeys(['server_arguments', 'clean_all', 'kill_servers', 'get_free_port', 'close_port_wrapper', 'kill_server_wrapper', 'setup_logger', 'disable_logger', 'postgres_class', 'get_running_servers', 'set_local_vars', 'spawn_server', 'preload_servers', 'CollectorHandler', 'get_logging_stats', 'LogEvent', 'ConnectionEvent', 'QueryEvent', 'LoginEvent', 'ProcessEvent', 'SnifferEvent', 'ErrorEvent'], 'helper'))
+
+__all__ = list(lazy_imports)
+
+
+def __getattr__(name):
+    if name not in lazy_imports:
+        raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
+    value = getattr(import_module('.' + lazy_imports[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
+
+
+if version_info < (3, 7):
+    for name in __all__:
+        __getattr__(name)
@@ -6,6 +6,7 @@ filterwarnings('ignore', category=RuntimeWarning, module='runpy')
 
 all_servers = ['QDNSServer', 'QFTPServer', 'QHTTPProxyServer', 'QHTTPServer', 'QHTTPSServer', 'QIMAPServer', 'QMysqlServer', 'QPOP3Server', 'QPostgresServer', 'QRedisServer', 'QSMBServer', 'QSMTPServer', 'QSOCKS5Server', 'QSSHServer', 'QTelnetServer', 'QVNCServer', 'QElasticServer', 'QMSSQLServer', 'QLDAPServer', 'QNTPServer', 'QMemcacheServer', 'QOracleServer', 'QSNMPServer']
 temp_honeypots = []
+twisted_servers = ['QDNSServer', 'QFTPServer', 'QHTTPProxyServer', 'QHTTPServer', 'QHTTPSServer', 'QIMAPServer', 'QMysqlServer', 'QPOP3Server', 'QPostgresServer', 'QRedisServer', 'QTelnetServer', 'QVNCServer', 'QMSSQLServer', 'QLDAPServer', 'QNTPServer', 'QMemcacheServer', 'QOracleServer', 'QSNMPServer']
 
 from signal import signal, alarm, SIGALRM, SIG_IGN, SIGTERM, SIGINT, SIGTSTP
 from time import sleep
@@ -76,12 +77,12 @@ def server_timeout(object, name):
 
 def main_logic():
 
-    from honeypots import QDNSServer, QFTPServer, QHTTPProxyServer, QHTTPServer, QHTTPSServer, QIMAPServer, QMysqlServer, QPOP3Server, QPostgresServer, QRedisServer, QSMBServer, QSMTPServer, QSOCKS5Server, QSSHServer, QTelnetServer, QVNCServer, QMSSQLServer, QElasticServer, QLDAPServer, QNTPServer, QMemcacheServer, QOracleServer, QSNMPServer, server_arguments, clean_all, postgres_class, setup_logger, QBSniffer, get_running_servers
+    import honeypots
+    from honeypots.helper import clean_all, setup_logger, disable_logger, get_free_port, preload_servers
     from atexit import register
     from argparse import ArgumentParser, SUPPRESS
     from sys import stdout
     from subprocess import Popen
-    from netifaces import ifaddresses, AF_INET, AF_LINK, interfaces
     from psutil import Process, net_io_counters
     from uuid import uuid4
     from json import JSONEncoder, dumps, load
@@ -109,12 +110,30 @@ def main_logic():
     ARG_PARSER_OPTIONAL.add_argument('--password', help='Override the password', metavar='', default='')
     ARG_PARSER_OPTIONAL.add_argument('--config', help='Use a config file for honeypots settings', metavar='', default='')
     ARG_PARSER_OPTIONAL.add_argument('--test', action='store_true', help='Test a honeypot')
+    ARG_PARSER_OPTIONAL.add_argument('--in-process', action='store_true', help='Run the Twisted based honeypots in this process on one shared reactor')
+    ARG_PARSER_OPTIONAL.add_argument('--fork', action='store_true', help='Fork honeypot processes from this process instead of starting a new interpreter for each one')
     ARG_PARSER_CHAMELEON = ARG_PARSER.add_argument_group('Chameleon')
     ARG_PARSER_CHAMELEON.add_argument('--chameleon', action='store_true', help='reserved for chameleon project')
     ARG_PARSER_CHAMELEON.add_argument('--sniffer', action='store_true', help='sniffer - reserved for chameleon project')
     ARG_PARSER_CHAMELEON.add_argument('--iptables', action='store_true', help='iptables - reserved for chameleon project')
     ARGV = ARG_PARSER.parse_args()
     config_data = None
+    in_process = []
+    if ARGV.fork:
+        preload_servers()
+
+    def start_server(x, auto=False):
+        if ARGV.in_process and x.__class__.__name__ in twisted_servers:
+            if auto and not x.auto_disabled:
+                x.port = get_free_port()
+            try:
+                x.run_server(run_reactor=False)
+                in_process.append(x)
+                return True
+            except Exception as e:
+                print('[!] Unable to start {} in process: {}'.format(x.__class__.__name__, e))
+                return False
+        return x.run_server(process=True, auto=auto)
     if ARGV.config != '':
         with open(ARGV.config) as f:
             try:
@@ -122,6 +141,13 @@ def main_logic():
             except BaseException:
                 print('[!] Unable to load or parse config.json file')
                 exit()
+            if 'collector' in config_data['logs'] and not ARGV.list and not ARGV.kill:
+                collector = honeypots.QLogCollector(config=ARGV.config)
+                if collector.run_collector(process=True):
+                    print('[x] Log collector is listening on {}'.format(collector.socket_path))
+                else:
+                    print('[!] Unable to start the log collector on {}'.format(collector.socket_path))
+                register(collector.kill_collector)
             if 'db' in config_data['logs']:
                 uuid = 'honeypotslogger' + '_' + 'main' + '_' + str(uuid4())[:8]
                 if 'db_options' in config_data:
@@ -133,6 +159,8 @@ def main_logic():
                         logs = setup_logger(uuid, ARGV.config, False)
                 else:
                     logs = setup_logger(uuid, ARGV.config, True)
+            elif 'collector' in config_data['logs']:
+                logs = setup_logger('honeypotslogger' + '_' + 'main' + '_' + str(uuid4())[:8], ARGV.config)
     if ARGV.list:
         list_all_honeypots()
     elif ARGV.kill:
@@ -142,6 +170,7 @@ def main_logic():
         if config_data['filter'] and config_data['interface']:
             if not ARGV.test:
                 if ARGV.sniffer:
+                    from netifaces import ifaddresses, AF_INET, AF_LINK, interfaces
                     current_interfaces = 'unknown'
                     try:
                         current_interfaces = ' '.join(interfaces())
@@ -173,7 +202,7 @@ def main_logic():
                         if 'q{}server'.format(honeypot).lower() == _honeypot.lower():
                             if ARGV.port != '':
                                 ARGV.port = int(ARGV.port)
-                            x = locals()[_honeypot](ip=ARGV.ip, port=ARGV.port, username=ARGV.username, password=ARGV.password, config=ARGV.config)
+                            x = getattr(honeypots, _honeypot)(ip=ARGV.ip, port=ARGV.port, username=ARGV.username, password=ARGV.password, config=ARGV.config)
                             if not ARGV.test:
                                 x.run_server(process=True)
                             else:
@@ -190,7 +219,7 @@ def main_logic():
                         if 'q{}server'.format(server).lower() == honeypot.lower():
                             if ARGV.port != '':
                                 ARGV.port = int(ARGV.port)
-                            x = locals()[honeypot](ip=ARGV.ip, port=ARGV.port, username=ARGV.username, password=ARGV.password, config=ARGV.config)
+                            x = getattr(honeypots, honeypot)(ip=ARGV.ip, port=ARGV.port, username=ARGV.username, password=ARGV.password, config=ARGV.config)
                             if not ARGV.test:
                                 x.run_server(process=True)
                             else:
@@ -203,7 +232,7 @@ def main_logic():
 
             if ARGV.sniffer:
                 print('[x] Start sniffer')
-                x = locals()['QBSniffer'](filter=config_data['filter'], interface=config_data['interface'], config=ARGV.config)
+                x = honeypots.QBSniffer(filter=config_data['filter'], interface=config_data['interface'], config=ARGV.config)
                 x.run_sniffer(process=True)
                 temp_honeypots.append(x)
 
@@ -241,8 +270,8 @@ def main_logic():
             try:
                 for honeypot in all_servers:
                     status = False
-                    x = locals()[honeypot](ip=ARGV.ip, username=ARGV.username, password=ARGV.password, config=ARGV.config)
-                    status = x.run_server(process=True, auto=True)
+                    x = getattr(honeypots, honeypot)(ip=ARGV.ip, username=ARGV.username, password=ARGV.password, config=ARGV.config)
+                    status = start_server(x, auto=True)
                     temp_honeypots.append([x, status])
             except Exception as e:
                 print(e)
@@ -254,10 +283,10 @@ def main_logic():
                     for honeypot in all_servers:
                         if 'q{}server'.format(server.split(':')[0]).lower() == honeypot.lower():
                             ARGV.port = int(server.split(':')[1])
-                            x = locals()[honeypot](ip=ARGV.ip, port=ARGV.port, username=ARGV.username, password=ARGV.password, config=ARGV.config)
+                            x = getattr(honeypots, honeypot)(ip=ARGV.ip, port=ARGV.port, username=ARGV.username, password=ARGV.password, config=ARGV.config)
                             status = False
                             if not ARGV.test:
-                                status = x.run_server(process=True)
+                                status = start_server(x)
                             else:
                                 server_timeout(x, honeypot)
                                 x.kill_server()
@@ -265,10 +294,10 @@ def main_logic():
                 elif ARGV.port != '':
                     for honeypot in all_servers:
                         if 'q{}server'.format(server).lower() == honeypot.lower():
-                            x = locals()[honeypot](ip=ARGV.ip, port=int(ARGV.port), username=ARGV.username, password=ARGV.password, config=ARGV.config)
+                            x = getattr(honeypots, honeypot)(ip=ARGV.ip, port=int(ARGV.port), username=ARGV.username, password=ARGV.password, config=ARGV.config)
                             status = False
                             if not ARGV.test:
-                                status = x.run_server(process=True)
+                                status = start_server(x)
                             else:
                                 server_timeout(x, honeypot)
                                 x.kill_server()
@@ -276,14 +305,22 @@ def main_logic():
                 else:
                     for honeypot in all_servers:
                         if 'q{}server'.format(server).lower() == honeypot.lower():
-                            x = locals()[honeypot](ip=ARGV.ip, username=ARGV.username, password=ARGV.password, config=ARGV.config)
+                            x = getattr(honeypots, honeypot)(ip=ARGV.ip, username=ARGV.username, password=ARGV.password, config=ARGV.config)
                             status = False
                             if not ARGV.test:
-                                status = x.run_server(process=True, auto=True)
+                                status = start_server(x, auto=True)
                             else:
                                 print('[x] {} was configured with random port, unable to test..'.format(honeypot))
                             temp_honeypots.append([x, status])
 
+        if len(in_process) > 0:
+            from twisted.internet import reactor
+            from twisted.python import log as tlog
+            from threading import Thread
+            disable_logger(1, tlog, setup_logger('honeypotslogger' + '_' + 'reactor' + '_' + str(uuid4())[:8], ARGV.config), None)
+            Thread(target=reactor.run, kwargs={'installSignalHandlers': False}, daemon=True).start()
+            print('[x] Running {} honeypots in process'.format(len(in_process)))
+
         if len(temp_honeypots) > 0:
             good = True
             for server in temp_honeypots:
@@ -308,6 +345,8 @@ def main_logic():
                 except Exception as e:
                     print(e)
                     pass
+            if len(in_process) > 0:
+                reactor.callFromThread(reactor.stop)
             print('[x] Please wait few seconds')
             sleep(5)
 
@@ -0,0 +1,356 @@
+'''
+//  -------------------------------------------------------------
+//  author        Giga
+//  project       qeeqbox/honeypots
+//  email         gigaqeeq@gmail.com
+//  description   binary_log.py (binary event log)
+//  licensee      AGPL-3.0
+//  -------------------------------------------------------------
+//  contributors list qeeqbox/honeypots/graphs/contributors
+//  -------------------------------------------------------------
+'''
+
+# Segment layout (.qbl), all integers little-endian
+#   magic b'QBL1'
+#   record: u32 size, u8 kind, body[size - 1]
+#     kind 1 string  u16 id, utf-8 bytes
+#     kind 2 event   f64 timestamp, u16 table id, u16 field count, fields
+#       field        u16 key id, u8 type, value
+# Index layout (.qbx), sparse and rebuilt from the segment if missing
+#   kind 1 string    u16 id, u16 size, utf-8 bytes
+#   kind 2 offset    f64 highest timestamp before offset, u64 offset
+
+from argparse import ArgumentParser
+from atexit import register
+from bisect import bisect_left
+from datetime import datetime, timezone
+from glob import glob
+from json import dumps, loads
+from logging import Handler
+from mmap import mmap, ACCESS_READ
+from os import makedirs, path
+from socket import inet_pton, inet_ntop, AF_INET, AF_INET6
+from struct import Struct
+from sys import stdout, stderr
+from threading import Event, Thread
+from time import time
+
+MAGIC = b'QBL1'
+KIND_STRING = 1
+KIND_EVENT = 2
+T_NONE, T_TRUE, T_FALSE, T_INT, T_FLOAT, T_STR, T_BYTES, T_IPV4, T_IPV6, T_SYMBOL, T_JSON = range(11)
+INTERNED_KEYS = {'server', 'action', 'status'}
+IP_KEYS = {'ip', 'src_ip', 'dst_ip'}
+MAX_STRINGS = 65535
+
+record_header = Struct('<IB')
+event_header = Struct('<dHH')
+string_header = Struct('<H')
+index_string = Struct('<BHH')
+index_offset = Struct('<BdQ')
+u32 = Struct('<I')
+i64 = Struct('<q')
+f64 = Struct('<d')
+
+
+class BinaryLogWriter():
+    def __init__(self, filename, max_bytes=268435456, index_interval=65536):
+        self.filename = filename
+        self.max_bytes = max_bytes
+        self.index_interval = index_interval
+        self.file = None
+        self.index = None
+        self.last_flush = time()
+        makedirs(path.dirname(filename) or '.', exist_ok=True)
+        self.open_segment()
+
+    def open_segment(self):
+        self.close()
+        name = '{}.{}'.format(self.filename, datetime.now().strftime('%Y%m%d-%H%M%S-%f'))
+        self.file = open(name + '.qbl', 'wb', buffering=1048576)
+        self.index = open(name + '.qbx', 'wb', buffering=65536)
+        self.file.write(MAGIC)
+        self.file.flush()
+        self.offset = len(MAGIC)
+        self.next_index = self.offset
+        self.max_timestamp = 0.0
+        self.strings = {}
+
+    def string_id(self, string):
+        sid = self.strings.get(string)
+        if sid is None:
+            if len(self.strings) >= MAX_STRINGS:
+                return None
+            sid = len(self.strings)
+            self.strings[string] = sid
+            encoded = string.encode('utf-8')
+            self.write_record(KIND_STRING, string_header.pack(sid) + encoded)
+            self.index.write(index_string.pack(KIND_STRING, sid, len(encoded)) + encoded)
+        return sid
+
+    def encode_value(self, key, value):
+        if value is None:
+            return bytes((T_NONE,))
+        if value is True:
+            return bytes((T_TRUE,))
+        if value is False:
+            return bytes((T_FALSE,))
+        if isinstance(value, int):
+            if -9223372036854775808 <= value <= 9223372036854775807:
+                return bytes((T_INT,)) + i64.pack(value)
+            value = str(value)
+        elif isinstance(value, float):
+            return bytes((T_FLOAT,)) + f64.pack(value)
+        if isinstance(value, str):
+            if key in IP_KEYS:
+                try:
+                    if ':' in value:
+                        return bytes((T_IPV6,)) + inet_pton(AF_INET6, value)
+                    return bytes((T_IPV4,)) + inet_pton(AF_INET, value)
+                except (OSError, ValueError):
+                    pass
+            if key in INTERNED_KEYS:
+                sid = self.string_id(value)
+                if sid is not None:
+                    return bytes((T_SYMBOL,)) + string_header.pack(sid)
+            encoded = value.encode('utf-8', 'replace')
+            return bytes((T_STR,)) + u32.pack(len(encoded)) + encoded
+        if isinstance(value, (bytes, bytearray)):
+            return bytes((T_BYTES,)) + u32.pack(len(value)) + bytes(value)
+        encoded = dumps(value, default=repr).encode('utf-8')
+        return bytes((T_JSON,)) + u32.pack(len(encoded)) + encoded
+
+    def write_record(self, kind, body):
+        self.file.write(record_header.pack(len(body) + 1, kind))
+        self.file.write(body)
+        self.offset += record_header.size + len(body)
+
+    def write(self, timestamp, table, data):
+        if self.offset >= self.max_bytes:
+            self.open_segment()
+        if self.offset >= self.next_index:
+            self.index.write(index_offset.pack(KIND_EVENT, self.max_timestamp, self.offset))
+            self.next_index = self.offset + self.index_interval
+        fields = []
+        for key, value in data.items():
+            key_id = self.string_id(str(key))
+            if key_id is not None:
+                fields.append(string_header.pack(key_id) + self.encode_value(key, value))
+        body = event_header.pack(timestamp, self.string_id(table) or 0, len(fields)) + b''.join(fields)
+        self.write_record(KIND_EVENT, body)
+        if timestamp > self.max_timestamp:
+            self.max_timestamp = timestamp
+        if time() - self.last_flush >= 1:
+            self.flush()
+
+    def flush(self):
+        if self.file is not None:
+            self.file.flush()
+            self.index.flush()
+            self.last_flush = time()
+
+    def close(self):
+        if self.file is not None:
+            self.flush()
+            self.file.close()
+            self.index.close()
+            self.file = None
+            self.index = None
+
+
+class BinaryLogReader():
+    def __init__(self, filename, max_skew=5):
+        self.filename = filename
+        self.max_skew = max_skew
+        self.strings = {}
+        self.index = []
+        if path.getsize(filename) < len(MAGIC):
+            raise ValueError('{} is empty'.format(filename))
+        self.file = open(filename, 'rb')
+        self.mm = mmap(self.file.fileno(), 0, access=ACCESS_READ)
+        if self.mm[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError('{} is not a binary event log'.format(filename))
+        self.load_index(path.splitext(filename)[0] + '.qbx')
+
+    def load_index(self, index_filename):
+        if not path.exists(index_filename):
+            return
+        with open(index_filename, 'rb') as f:
+            data = f.read()
+        offset = 0
+        while offset < len(data):
+            if data[offset] == KIND_STRING and offset + index_string.size <= len(data):
+                _, sid, size = index_string.unpack_from(data, offset)
+                offset += index_string.size
+                self.strings[sid] = data[offset:offset + size].decode('utf-8')
+                offset += size
+            elif data[offset] == KIND_EVENT and offset + index_offset.size <= len(data):
+                _, max_timestamp, event_offset = index_offset.unpack_from(data, offset)
+                self.index.append((max_timestamp, event_offset))
+                offset += index_offset.size
+            else:
+                break
+
+    def load_strings(self):
+        for kind, offset, size in self.records(len(MAGIC)):
+            if kind == KIND_STRING:
+                self.strings[string_header.unpack_from(self.mm, offset)[0]] = self.mm[offset + string_header.size:offset + size].decode('utf-8')
+
+    def records(self, offset):
+        end = len(self.mm)
+        while offset + record_header.size <= end:
+            size, kind = record_header.unpack_from(self.mm, offset)
+            offset += record_header.size
+            if offset + size - 1 > end:
+                return
+            yield kind, offset, size - 1
+            offset += size - 1
+
+    def string(self, sid):
+        if sid not in self.strings:
+            self.load_strings()
+        return self.strings.get(sid, '')
+
+    def decode_value(self, offset):
+        mm = self.mm
+        value_type = mm[offset]
+        offset += 1
+        if value_type == T_NONE:
+            return None, offset
+        if value_type == T_TRUE:
+            return True, offset
+        if value_type == T_FALSE:
+            return False, offset
+        if value_type == T_INT:
+            return i64.unpack_from(mm, offset)[0], offset + i64.size
+        if value_type == T_FLOAT:
+            return f64.unpack_from(mm, offset)[0], offset + f64.size
+        if value_type == T_IPV4:
+            return inet_ntop(AF_INET, mm[offset:offset + 4]), offset + 4
+        if value_type == T_IPV6:
+            return inet_ntop(AF_INET6, mm[offset:offset + 16]), offset + 16
+        if value_type == T_SYMBOL:
+            return self.string(string_header.unpack_from(mm, offset)[0]), offset + string_header.size
+        size = u32.unpack_from(mm, offset)[0]
+        offset += u32.size
+        raw = mm[offset:offset + size]
+        if value_type == T_STR:
+            return raw.decode('utf-8'), offset + size
+        if value_type == T_BYTES:
+            return raw, offset + size
+        return loads(raw), offset + size
+
+    def decode_event(self, offset):
+        timestamp, table_id, count = event_header.unpack_from(self.mm, offset)
+        offset += event_header.size
+        data = {}
+        for _ in range(count):
+            key_id = string_header.unpack_from(self.mm, offset)[0]
+            data[self.string(key_id)], offset = self.decode_value(offset + string_header.size)
+        return timestamp, self.string(table_id), data
+
+    def read(self, start=None, end=None):
+        offset = len(MAGIC)
+        if start is not None and self.index:
+            position = bisect_left([max_timestamp for max_timestamp, _ in self.index], start) - 1
+            if position >= 0:
+                offset = self.index[position][1]
+        for kind, record_offset, _ in self.records(offset):
+            if kind != KIND_EVENT:
+                continue
+            timestamp = event_header.unpack_from(self.mm, record_offset)[0]
+            if end is not None and timestamp > end + self.max_skew:
+                return
+            if (start is None or timestamp >= start) and (end is None or timestamp <= end):
+                yield self.decode_event(record_offset)
+
+    def close(self):
+        self.mm.close()
+        self.file.close()
+
+
+class BinaryLogHandler(Handler):
+    def __init__(self, filename, max_bytes=268435456, flush_interval=1):
+        Handler.__init__(self)
+        self.writer = BinaryLogWriter(filename, max_bytes)
+        self.flush_interval = flush_interval
+        self.flush_event = Event()
+        self.closed = False
+        self.flush_thread = Thread(target=self.flush_loop, daemon=True)
+        self.flush_thread.start()
+        register(self.close)
+
+    def emit(self, record):
+        try:
+            if hasattr(record.msg, 'as_dict'):
+                self.writer.write(record.created, record.msg.table, record.msg.data)
+            elif isinstance(record.msg, list) and len(record.msg) == 2:
+                self.writer.write(record.created, record.msg[0], record.msg[1])
+        except Exception:
+            self.handleError(record)
+
+    def flush_loop(self):
+        while not self.closed:
+            self.flush_event.wait(self.flush_interval)
+            self.flush()
+
+    def flush(self):
+        self.acquire()
+        try:
+            self.writer.flush()
+        finally:
+            self.release()
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.flush_event.set()
+            self.flush_thread.join(5)
+        self.acquire()
+        try:
+            self.writer.close()
+        finally:
+            self.release()
+        Handler.close(self)
+
+
+def parse_time(value):
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        parsed = datetime.fromisoformat(value)
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=timezone.utc)
+        return parsed.timestamp()
+
+
+def main():
+    parser = ArgumentParser(description='Print events from binary event log segments as NDJSON')
+    parser.add_argument('files', nargs='+', help='.qbl segments or glob patterns')
+    parser.add_argument('--start', help='unix time or ISO date', default=None)
+    parser.add_argument('--end', help='unix time or ISO date', default=None)
+    args = parser.parse_args()
+    start, end = parse_time(args.start), parse_time(args.end)
+    for pattern in args.files:
+        for filename in sorted(glob(pattern)):
+            if path.getsize(filename) <= len(MAGIC):
+                continue
+            try:
+                reader = BinaryLogReader(filename)
+            except (OSError, ValueError) as e:
+                stderr.write('Skipping {} -> {}\n'.format(filename, e))
+                continue
+            try:
+                for timestamp, table, data in reader.read(start, end):
+                    stdout.write(dumps({'date': datetime.fromtimestamp(timestamp, timezone.utc).isoformat(), 'table': table, 'data': data}, default=lambda obj: obj.decode('utf-8', 'ignore') if isinstance(obj, bytes) else repr(obj)) + '\n')
+            except Exception as e:
+                stderr.write('Stopped reading {} -> {}\n'.format(filename, repr(e)))
+            finally:
+                reader.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -17,9 +17,8 @@ from twisted.names import dns, error, client
 from twisted.names.server import DNSServerFactory
 from twisted.internet import defer, reactor
 from twisted.python import log as tlog
-from subprocess import Popen
 from os import path
-from honeypots.helper import close_port_wrapper, get_free_port, kill_server_wrapper, server_arguments, setup_logger, disable_logger, set_local_vars, check_if_server_is_running
+from honeypots.helper import close_port_wrapper, get_free_port, kill_server_wrapper, server_arguments, spawn_server, setup_logger, disable_logger, set_local_vars, check_if_server_is_running, ConnectionEvent, QueryEvent, ProcessEvent, ErrorEvent, SessionFactory
 from uuid import uuid4
 
 
@@ -44,9 +43,9 @@ class QDNSServer():
         self.port = port or self.port or 53
         self.username = username or self.username or 'test'
         self.password = password or self.password or 'test'
-        disable_logger(1, tlog)
+        disable_logger(1, tlog, self.logs, 'dns_server')
 
-    def dns_server_main(self):
+    def dns_server_main(self, run_reactor=True):
         _q_s = self
 
         class CustomCilentResolver(client.Resolver):
@@ -61,23 +60,24 @@ class QDNSServer():
         class CustomDNSServerFactory(DNSServerFactory):
             def gotResolverResponse(self, response, protocol, message, address):
                 args = (self, response, protocol, message, address)
-                _q_s.logs.info(['servers', {'server': 'dns_server', 'action': 'connection', 'ip': address[0], 'port':address[1]}])
+                _q_s.logs.info(ConnectionEvent('dns_server', address[0], address[1]))
                 try:
                     for items in response:
                         for item in items:
-                            _q_s.logs.info(['servers', {'server': 'dns_server', 'action': 'query', 'ip': address[0], 'port':address[1], 'payload':item.payload}])
+                            _q_s.logs.info(QueryEvent('dns_server', address[0], address[1], extra={'payload': item.payload}))
                 except Exception as e:
-                    _q_s.logs.error(['errors', {'server': 'dns_server', 'error': 'gotResolverResponse', 'type': 'error -> ' + repr(e)}])
+                    _q_s.logs.error(ErrorEvent('dns_server', 'gotResolverResponse', 'error -> ' + repr(e)))
                 return DNSServerFactory.gotResolverResponse(*args)
 
         self.resolver = CustomCilentResolver(servers=self.resolver_addresses)
         self.factory = CustomDNSServerFactory(clients=[self.resolver])
         self.protocol = dns.DNSDatagramProtocol(controller=self.factory)
         reactor.listenUDP(self.port, self.protocol, interface=self.ip)
-        reactor.listenTCP(self.port, self.factory, interface=self.ip)
-        reactor.run()
+        reactor.listenTCP(self.port, SessionFactory(self.factory, 'dns_server', self.logs), interface=self.ip)
+        if run_reactor:
+            reactor.run()
 
-    def run_server(self, process=False, auto=False):
+    def run_server(self, process=False, auto=False, run_reactor=True):
         status = 'error'
         run = False
         if process:
@@ -90,11 +90,11 @@ class QDNSServer():
                 run = True
 
             if run:
-                self.process = Popen(['python3', path.realpath(__file__), '--custom', '--ip', str(self.ip), '--port', str(self.port), '--mocking', str(self.mocking), '--config', str(self.config), '--uuid', str(self.uuid)])
+                self.process = spawn_server(self, self.dns_server_main, ['python3', path.realpath(__file__), '--custom', '--ip', str(self.ip), '--port', str(self.port), '--mocking', str(self.mocking), '--config', str(self.config), '--uuid', str(self.uuid)])
                 if self.process.poll() is None and check_if_server_is_running(self.uuid):
                     status = 'success'
 
-            self.logs.info(['servers', {'server': 'dns_server', 'action': 'process', 'status': status, 'ip': self.ip, 'port': self.port}])
+            self.logs.info(ProcessEvent('dns_server', status, self.ip, self.port))
 
             if status == 'success':
                 return True
@@ -102,7 +102,7 @@ class QDNSServer():
                 self.kill_server()
                 return False
         else:
-            self.dns_server_main()
+            self.dns_server_main(run_reactor)
         return None
 
     def close_port(self):
@@ -20,13 +20,12 @@ from json import dumps
 from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
 from urllib.parse import urlparse
 from zlib import compressobj, DEFLATED
-from subprocess import Popen
 from ssl import wrap_socket
 from uuid import uuid4
 from os import path
 from OpenSSL import crypto
 from tempfile import gettempdir, _get_candidate_names
-from honeypots.helper import check_if_server_is_running, close_port_wrapper, get_free_port, kill_server_wrapper, server_arguments, set_local_vars, setup_logger
+from honeypots.helper import check_if_server_is_running, close_port_wrapper, get_free_port, kill_server_wrapper, server_arguments, spawn_server, set_local_vars, setup_logger, ConnectionEvent, QueryEvent, LoginEvent, ProcessEvent
 
 disable_warnings()
 
@@ -97,7 +96,7 @@ class QElasticServer():
                 except Exception:
                     pass
 
-                _q_s.logs.info(['servers', {'server': 'elastic_server', 'action': 'dump', 'line': check_bytes(self.raw_requestline), 'ip': self.client_address[0], 'headers':headers}])
+                _q_s.logs.info(QueryEvent('elastic_server', self.client_address[0], action='dump', extra={'line': check_bytes(self.raw_requestline), 'headers': headers}))
                 return headers
 
             def _remove_headers(self, headers):
@@ -151,12 +150,12 @@ class QElasticServer():
 
                 key = self.server.get_auth_key()
                 if self.headers.get('Authorization') is None:
-                    _q_s.logs.info(['servers', {'server': 'elastic_server', 'action': 'login', 'status': 'failed', 'ip': self.client_address[0], 'username': username, 'password':password}])
+                    _q_s.logs.info(LoginEvent('elastic_server', 'failed', self.client_address[0], None, username, password))
                     auth_paylaod = bytes(dumps({'error': {'root_cause': [{'type': 'security_exception', 'reason': 'unable to authenticate user [{}] for REST request [/]'.format(username), 'header': {'WWW-Authenticate': 'Basic realm=\"security\" charset=\"UTF-8\"'}}], 'type': 'security_exception', 'reason': 'unable to authenticate user [{}] for REST request [/]'.format(username), 'header': {'WWW-Authenticate': 'Basic realm=\"security\" charset=\"UTF-8\"'}}, 'status': 401}), 'utf-8')
                     self.wfile.write(self._set_response_gzip_auth(auth_paylaod, 401))
                 elif self.headers.get('Authorization') == 'Basic ' + str(key):
                     extracted = ''
-                    _q_s.logs.info(['servers', {'server': 'elastic_server', 'action': 'login', 'status': 'success', 'ip': self.client_address[0], 'username': _q_s.username, 'password':_q_s.password}])
+                    _q_s.logs.info(LoginEvent('elastic_server', 'success', self.client_address[0], None, _q_s.username, _q_s.password))
                     try:
                         extracted = urlparse(self.path).path
                     except BaseException:
@@ -182,7 +181,7 @@ class QElasticServer():
                     authorization_string = self.headers.get('Authorization').split(' ')
                     basic = b64decode(authorization_string[1]).decode('utf-8')
                     username, password = basic.split(':')
-                    _q_s.logs.info(['servers', {'server': 'elastic_server', 'action': 'login', 'status': 'failed', 'ip': self.client_address[0], 'username': username, 'password':password}])
+                    _q_s.logs.info(LoginEvent('elastic_server', 'failed', self.client_address[0], None, username, password))
                     auth_paylaod = bytes(dumps({'error': {'root_cause': [{'type': 'security_exception', 'reason': 'missing authentication credentials for REST request [/]', 'header': {'WWW-Authenticate': 'Basic realm=\"security\" charset=\"UTF-8\"'}}], 'type': 'security_exception', 'reason': 'missing authentication credentials for REST request [/]', 'header': {'WWW-Authenticate': 'Basic realm=\"security\" charset=\"UTF-8\"'}}, 'status': 401}), 'utf-8')
                     self.wfile.write(self._set_response_gzip_auth(auth_paylaod, 401))
 
@@ -198,7 +197,7 @@ class QElasticServer():
                 return
 
             def handle_one_request(self):
-                _q_s.logs.info(['servers', {'server': 'elastic_server', 'action': 'connection', 'ip': self.client_address[0]}])
+                _q_s.logs.info(ConnectionEvent('elastic_server', self.client_address[0]))
                 return SimpleHTTPRequestHandler.handle_one_request(self)
 
         class CustomElasticServer(ThreadingHTTPServer):
@@ -232,11 +231,11 @@ class QElasticServer():
                 run = True
 
             if run:
-                self.process = Popen(['python3', path.realpath(__file__), '--custom', '--ip', str(self.ip), '--port', str(self.port), '--username', str(self.username), '--password', str(self.password), '--mocking', str(self.mocking), '--config', str(self.config), '--uuid', str(self.uuid)])
+                self.process = spawn_server(self, self.elastic_server_main, ['python3', path.realpath(__file__), '--custom', '--ip', str(self.ip), '--port', str(self.port), '--username', str(self.username), '--password', str(self.password), '--mocking', str(self.mocking), '--config', str(self.config), '--uuid', str(self.uuid)])
                 if self.process.poll() is None and check_if_server_is_running(self.uuid):
                     status = 'success'
 
-            self.logs.info(['servers', {'server': 'elastic_server', 'action': 'process', 'status': status, 'ip': self.ip, 'port': self.port, 'username': self.username, 'password': self.password}])
+            self.logs.info(ProcessEvent('elastic_server', status, self.ip, self.port, self.username, self.password))
 
             if status == 'success':
                 return True
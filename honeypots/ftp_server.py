@@ -16,9 +16,8 @@ filterwarnings(action='ignore', module='.*OpenSSL.*')
 from twisted.protocols.ftp import FTPFactory, FTP, AUTH_FAILURE
 from twisted.internet import reactor
 from twisted.python import log as tlog
-from subprocess import Popen
 from os import path
-from honeypots.helper import close_port_wrapper, get_free_port, kill_server_wrapper, server_arguments, setup_logger, disable_logger, set_local_vars, check_if_server_is_running
+from honeypots.helper import close_port_wrapper, get_free_port, kill_server_wrapper, server_arguments, spawn_server, setup_logger, disable_logger, set_local_vars, check_if_server_is_running, LoginEvent, ProcessEvent, SessionFactory
 from uuid import uuid4
 
 
@@ -43,9 +42,9 @@ class QFTPServer():
         self.port = port or self.port or 21
         self.username = username or self.username or 'test'
         self.password = password or self.password or 'test'
-        disable_logger(1, tlog)
+        disable_logger(1, tlog, self.logs, 'ftp_server')
 
-    def ftp_server_main(self):
+    def ftp_server_main(self, run_reactor=True):
         _q_s = self
 
         class CustomFTPProtocol(FTP):
@@ -64,7 +63,8 @@ class QFTPServer():
                     username = _q_s.username
                     password = _q_s.password
                     status = 'success'
-                _q_s.logs.info(['servers', {'server': 'ftp_server', 'action': 'login', 'status': status, 'ip': self.transport.getPeer().host, 'port': self.transport.getPeer().port, 'username': username, 'password': password}])
+                peer = self.transport.getPeer()
+                _q_s.logs.info(LoginEvent('ftp_server', status, peer.host, peer.port, username, password))
                 return AUTH_FAILURE
 
         class CustomFTPFactory(FTPFactory):
@@ -78,10 +78,11 @@ class QFTPServer():
                 return p
 
         factory = CustomFTPFactory()
-        reactor.listenTCP(port=self.port, factory=factory, interface=self.ip)
-        reactor.run()
+        reactor.listenTCP(port=self.port, factory=SessionFactory(factory, 'ftp_server', self.logs), interface=self.ip)
+        if run_reactor:
+            reactor.run()
 
-    def run_server(self, process=False, auto=False):
+    def run_server(self, process=False, auto=False, run_reactor=True):
         status = 'error'
         run = False
         if process:
@@ -94,11 +95,11 @@ class QFTPServer():
                 run = True
 
             if run:
-                self.process = Popen(['python3', path.realpath(__file__), '--custom', '--ip', str(self.ip), '--port', str(self.port), '--username', str(self.username), '--password', str(self.password), '--mocking', str(self.mocking), '--config', str(self.config), '--uuid', str(self.uuid)])
+                self.process = spawn_server(self, self.ftp_server_main, ['python3', path.realpath(__file__), '--custom', '--ip', str(self.ip), '--port', str(self.port), '--username', str(self.username), '--password', str(self.password), '--mocking', str(self.mocking), '--config', str(self.config), '--uuid', str(self.uuid)])
                 if self.process.poll() is None and check_if_server_is_running(self.uuid):
                     status = 'success'
 
-            self.logs.info(['servers', {'server': 'ftp_server', 'action': 'process', 'status': status, 'ip': self.ip, 'port': self.port, 'username': self.username, 'password': self.password}])
+            self.logs.info(ProcessEvent('ftp_server', status, self.ip, self.port, self.username, self.password))
 
             if status == 'success':
                 return True
@@ -106,7 +107,7 @@ class QFTPServer():
                 self.kill_server()
                 return False
         else:
-            self.ftp_server_main()
+            self.ftp_server_main(run_reactor)
         return None
 
     def close_port(self):
@@ -10,22 +10,45 @@
 //  -------------------------------------------------------------
 '''
 
-from psutil import process_iter
-from signal import SIGTERM
+from psutil import net_connections, Process, Error as ProcessError, STATUS_ZOMBIE, CONN_LISTEN
+from signal import signal, SIGTERM, SIGKILL, SIGINT, SIG_DFL
+from subprocess import Popen, TimeoutExpired
 from argparse import ArgumentParser
-from socket import socket, AF_INET, SOCK_STREAM
+from socket import socket, AF_INET, AF_UNIX, SOCK_STREAM, create_connection, gethostname
+from ssl import create_default_context
+from collections import deque
 from json import JSONEncoder, dumps, load
-from logging import Handler, Formatter, DEBUG, getLogger
+from logging import Handler, Filter, Formatter, DEBUG, getLogger
+import sys
 from sys import stdout
-from datetime import datetime
-from logging.handlers import RotatingFileHandler, SysLogHandler
-from tempfile import _get_candidate_names, gettempdir
-from os import makedirs, path, scandir
-from psycopg2 import sql, connect
-from time import sleep
+from datetime import datetime, timezone, timedelta
+from logging.handlers import BaseRotatingHandler, SysLogHandler, QueueHandler, QueueListener
+from gzip import open as gzip_open
+from shutil import copyfileobj
+from queue import Queue, Full
+from tempfile import gettempdir
+from os import devnull, makedirs, path, scandir, rename, remove, rmdir, fsync, getpid, geteuid, lstat, readlink, fork, kill, waitpid, _exit, WNOHANG, WIFSIGNALED, WTERMSIG, WEXITSTATUS
+from fcntl import flock, LOCK_EX, LOCK_NB
+from stat import S_ISDIR, S_IMODE
+from sqlite3 import connect as sqlite_connect, OperationalError as SQLiteOperationalError
+from contextlib import contextmanager
+from threading import Thread, Lock, Event, local
+from atexit import register, _clear as clear_exit_handlers, _run_exitfuncs as run_exit_handlers
+from time import sleep, time
 from traceback import format_exc
-from collections import Mapping
+from collections.abc import Mapping
+from re import compile as re_compile
+from math import isfinite
+from struct import Struct
+from zlib import compress, decompressobj
+from hashlib import sha256
+from hmac import new as hmac_new
+from ipaddress import ip_address
 from urllib.parse import urlparse
+from uuid import uuid4
+import gc
+from twisted.protocols.policies import WrappingFactory, ProtocolWrapper
+from honeypots.binary_log import BinaryLogHandler
 
 old_stderr = sys.stderr
 sys.stderr = open(devnull, 'w')
@@ -52,8 +75,8 @@ def get_running_servers():
     temp_list = []
     try:
         honeypots = ['QDNSServer', 'QFTPServer', 'QHTTPProxyServer', 'QHTTPServer', 'QHTTPSServer', 'QIMAPServer', 'QMysqlServer', 'QPOP3Server', 'QPostgresServer', 'QRedisServer', 'QSMBServer', 'QSMTPServer', 'QSOCKS5Server', 'QSSHServer', 'QTelnetServer', 'QVNCServer', 'QElasticServer', 'QMSSQLServer', 'QLDAPServer', 'QNTPServer', 'QMemcacheServer', 'QOracleServer', 'QSNMPServer']
-        for process in process_iter():
-            cmdline = ' '.join(process.cmdline())
+        for entry, process in registered_servers():
+            cmdline = entry['cmdline']
             for honeypot in honeypots:
                 if '--custom' in cmdline and honeypot in cmdline:
                     temp_list.append(cmdline.split(' --custom ')[1])
@@ -62,13 +85,163 @@ def get_running_servers():
     return temp_list
 
 
-def disable_logger(logger_type, object):
+state_location = path.join(gettempdir(), 'honeypots_run_{}'.format(geteuid()))
+
+
+def check_state_location(create=False):
+    try:
+        if create:
+            makedirs(state_location, mode=0o700, exist_ok=True)
+        info = lstat(state_location)
+    except OSError:
+        return False
+    return S_ISDIR(info.st_mode) and info.st_uid == geteuid() and S_IMODE(info.st_mode) & 0o077 == 0
+
+
+def register_server(uuid, pid, args, parent=None):
+    if not check_state_location(create=True):
+        return
+    try:
+        temp_file = path.join(state_location, uuid + '.tmp')
+        process = Process(pid)
+        with open(temp_file, 'w') as f:
+            f.write(dumps({'uuid': uuid, 'pid': pid, 'create_time': process.create_time(), 'cmdline': ' '.join(args), 'process_cmdline': ' '.join(process.cmdline()), 'parent': parent}))
+        rename(temp_file, path.join(state_location, uuid + '.json'))
+    except (OSError, ProcessError):
+        pass
+
+
+def unregister_server(uuid):
+    try:
+        remove(path.join(state_location, uuid + '.json'))
+    except OSError:
+        pass
+
+
+def get_registered_server(uuid):
+    if not check_state_location():
+        return None
+    try:
+        with open(path.join(state_location, uuid + '.json')) as f:
+            entry = load(f)
+        process = Process(entry['pid'])
+        if entry['uuid'] == uuid and process.create_time() == entry['create_time'] and process.status() != STATUS_ZOMBIE and ' '.join(process.cmdline()) == entry['process_cmdline']:
+            if (entry['parent'] is None and uuid in entry['process_cmdline']) or (entry['parent'] is not None and process.ppid() == entry['parent']):
+                return entry, process
+    except (OSError, ValueError, KeyError, TypeError, ProcessError):
+        pass
+    unregister_server(uuid)
+    return None
+
+
+def stop_process(process, timeout=5):
+    try:
+        process.send_signal(SIGTERM)
+        process.wait(timeout)
+    except ProcessError:
+        try:
+            process.kill()
+        except ProcessError:
+            pass
+
+
+def terminate_process(process, timeout=5):
+    process.terminate()
+    try:
+        process.wait(timeout)
+    except TimeoutExpired:
+        process.kill()
+        process.wait(timeout)
+
+
+def registered_servers():
+    temp_list = []
+    if not check_state_location():
+        return temp_list
+    try:
+        names = [entry.name[:-5] for entry in scandir(state_location) if entry.name.endswith('.json')]
+    except OSError:
+        return temp_list
+    for uuid in names:
+        registered = get_registered_server(uuid)
+        if registered is not None:
+            temp_list.append(registered)
+    return temp_list
+
+
+twisted_observer = None
+
+
+def disable_logger(logger_type, object, logs=None, server=None):
+    global twisted_observer
     if logger_type == 1:
-        temp_name = path.join(gettempdir(), next(_get_candidate_names()))
-        object.startLogging(open(temp_name, 'w'), setStdout=False)
+        if twisted_observer is None:
+            twisted_observer = TwistedLogObserver()
+            object.startLoggingWithObserver(twisted_observer, setStdout=False)
+        if server is None:
+            twisted_observer.reactor_logs = logs
+        else:
+            twisted_observer.servers[server] = logs
 
 
-def setup_logger(temp_name, config, drop=False):
+class TwistedLogObserver():
+    def __init__(self, interval=60, burst=5, max_keys=1000):
+        self.servers = {}
+        self.reactor_logs = None
+        self.interval = interval
+        self.burst = burst
+        self.max_keys = max_keys
+        self.seen = {}
+
+    def get_logs(self, event):
+        system = str(event.get('log_system') or event.get('system') or '')
+        server = system.split(',')[0]
+        if server in self.servers:
+            return server, self.servers[server]
+        if self.reactor_logs is not None:
+            return 'reactor', self.reactor_logs
+        if len(self.servers) == 1:
+            return next(iter(self.servers.items()))
+        if self.servers:
+            return 'reactor', next(iter(self.servers.values()))
+        return None, None
+
+    def __call__(self, event):
+        if not event.get('isError'):
+            return
+        failure = event.get('failure')
+        if failure is not None:
+            message = '{}: {}'.format(failure.type.__name__, failure.getErrorMessage())
+            key = (failure.type, failure.frames[-1][1:3] if failure.frames else None)
+        else:
+            message = ' '.join(str(item) for item in event.get('message', ())) or str(event.get('why'))
+            key = message
+        now = time()
+        entry = self.seen.get(key)
+        if entry is None or now - entry[0] >= self.interval:
+            if len(self.seen) >= self.max_keys:
+                self.seen.clear()
+            suppressed = entry[2] if entry is not None else 0
+            entry = self.seen[key] = [now, 0, 0]
+        else:
+            suppressed = 0
+        entry[1] += 1
+        if entry[1] > self.burst:
+            entry[2] += 1
+            return
+        server, logs = self.get_logs(event)
+        if logs is not None:
+            fields = {}
+            if failure is not None:
+                fields['traceback'] = failure.getTraceback()[-4096:]
+            if event.get('why'):
+                fields['why'] = str(event['why'])
+            if suppressed:
+                fields['suppressed'] = suppressed
+            logs.error(ErrorEvent(server, 'twisted', message, fields))
+
+
+def setup_logger(temp_name, config, drop=False, collector=False):
     logs = 'terminal'
     logs_location = ''
     syslog_address = ''
@@ -78,7 +251,7 @@ def setup_logger(temp_name, config, drop=False):
         try:
             with open(config) as f:
                 config_data = load(f)
-                logs = config_data['logs']
+                logs = config_data.get('collector_logs', 'terminal') if collector else config_data['logs']
                 logs_location = config_data['logs_location']
                 syslog_address = config_data['syslog_address']
                 syslog_facility = config_data['syslog_facility']
@@ -89,73 +262,205 @@ def setup_logger(temp_name, config, drop=False):
     if not path.exists(logs_location):
         makedirs(logs_location)
     file_handler = None
+    handlers = []
     ret_logs_obj = getLogger(temp_name)
     ret_logs_obj.setLevel(DEBUG)
     if 'db' in logs:
-        ret_logs_obj.addHandler(CustomHandler(temp_name, logs, config_data, drop))
+        handlers.append(('db', CustomHandler(temp_name, logs, config_data, drop)))
     elif 'terminal' in logs:
-        ret_logs_obj.addHandler(CustomHandler(temp_name, logs))
+        handlers.append(('terminal', CustomHandler(temp_name, logs)))
     if 'file' in logs:
-        formatter = Formatter('[%(asctime)s] [%(name)s] [%(levelname)s] - %(message)s')
-        file_handler = RotatingFileHandler(path.join(logs_location, temp_name), maxBytes=10000, backupCount=10)
-        file_handler.setFormatter(formatter)
-        ret_logs_obj.addHandler(file_handler)
+        file_handler = CustomFileHandler(path.join(logs_location, temp_name), config_data.get('file_max_bytes', 104857600), config_data.get('file_backup_count', 10), config_data.get('file_rotate_interval', 86400), config_data.get('file_compress', True))
+        handlers.append(('file', file_handler))
+    if 'sqlite' in logs:
+        handlers.append(('sqlite', SQLiteHandler(config_data.get('sqlite_path') or path.join(logs_location, 'honeypots.sqlite'), config_data.get('sqlite_batch_size', 1000), config_data.get('sqlite_flush_interval', 1))))
+    if 'binary' in logs:
+        handlers.append(('binary', BinaryLogHandler(path.join(logs_location, 'binary', temp_name), config_data.get('binary_max_bytes', 268435456), config_data.get('binary_flush_interval', 1))))
     if 'syslog' in logs:
         if syslog_address == '':
             address = ('localhost', 514)
         else:
             address = (syslog_address.split('//')[1].split(':')[0], int(syslog_address.split('//')[1].split(':')[1]))
-        syslog = SysLogHandler(address=address, facility=syslog_facility)
-        formatter = Formatter('[%(name)s] [%(levelname)s] - %(message)s')
-        syslog.setFormatter(formatter)
-        ret_logs_obj.addHandler(syslog)
+        if syslog_address.startswith(('tcp://', 'tls://')):
+            syslog = SysLogTCPHandler(address[0], address[1], syslog_facility, syslog_address.startswith('tls://'), config_data.get('syslog_batch_size', 500), config_data.get('syslog_flush_interval', 0.5))
+        else:
+            syslog = SysLogHandler(address=address, facility=syslog_facility)
+            formatter = Formatter('[%(name)s] [%(levelname)s] - %(message)s')
+            syslog.setFormatter(formatter)
+        handlers.append(('syslog', syslog))
+    if 'forward' in logs:
+        forward_address = urlparse(config_data['forward_address'])
+        spool = None
+        if config_data.get('forward_spool', True):
+            spool = EventSpool(path.join(logs_location, 'forward_spool'), temp_name, config_data.get('forward_spool_segment_size', 16777216), config_data.get('forward_spool_fsync', 'interval'))
+        handlers.append(('forward', ForwarderHandler(forward_address.hostname, forward_address.port or 5140, forward_address.scheme == 'tls', config_data.get('forward_tls_ca'), config_data.get('forward_batch_size', 500), config_data.get('forward_flush_interval', 1), config_data.get('forward_ack_timeout', 30), spool, config_data.get('forward_token'), config_data.get('forward_tls_cert'), config_data.get('forward_tls_key'))))
+    if 'collector' in logs:
+        handlers.append(('collector', CollectorHandler(get_collector_socket(config_data), config_data.get('collector_batch_size', 500), config_data.get('collector_flush_interval', 0.1))))
+    if config_data and config_data.get('rules') and not collector:
+        ret_logs_obj.addFilter(RulesFilter(config_data['rules']))
+    ret_logs_obj.addFilter(SessionFilter(config_data.get('session_mode', 'events') == 'summary' if config_data else False))
+    if 'aggregate' in logs:
+        ret_logs_obj.addFilter(ConnectionAggregator(ret_logs_obj, config_data.get('aggregate_window', 60), config_data.get('aggregate_actions', ['connection'])))
+    if 'queue' in logs:
+        queue_options = config_data.get('logs_queue', {})
+        priorities = dict(default_priorities, **config_data.get('logs_priorities', {}))
+        shedding = dict(default_shedding, **config_data.get('logs_shedding', {}))
+        queue_handlers = []
+        for name, handler in handlers:
+            options = queue_options.get(name, {})
+            queue_handler = CustomQueueHandler(name, options.get('size', config_data.get('logs_queue_size', 10000)), options.get('overflow', config_data.get('logs_queue_overflow', 'drop_new')), options.get('retries', config_data.get('logs_queue_retries', 2)), options.get('retry_delay', config_data.get('logs_queue_retry_delay', 0.1)), priorities, options.get('shedding', shedding))
+            queue_handler.start(handler)
+            ret_logs_obj.addHandler(queue_handler)
+            queue_handlers.append(queue_handler)
+        if config_data.get('logs_metrics_interval', 60):
+            LoggingMetrics(ret_logs_obj, queue_handlers, config_data.get('logs_metrics_interval', 60))
+    else:
+        for name, handler in handlers:
+            ret_logs_obj.addHandler(handler)
     return ret_logs_obj
 
 
+def get_collector_socket(config_data):
+    if config_data and config_data.get('collector_socket'):
+        return config_data['collector_socket']
+    return path.join(gettempdir(), 'honeypots_collector.sock')
+
+
 def clean_all():
-    for entry in scandir('.'):
-        if entry.is_file() and entry.name.endswith('_server.py'):
-            kill_servers(entry.name)
+    for name in list(spawned_servers):
+        kill_server_wrapper(None, name, None)
+    kill_servers('_server.py')
 
 
 def kill_servers(name):
     try:
-        for process in process_iter():
-            cmdline = ' '.join(process.cmdline())
-            if '--custom' in cmdline and name in cmdline:
-                process.send_signal(SIGTERM)
-                process.kill()
+        for entry, process in registered_servers():
+            if '--custom' in entry['cmdline'] and name in entry['cmdline']:
+                unregister_server(entry['uuid'])
+                stop_process(process)
     except BaseException:
         pass
 
 
 def check_if_server_is_running(uuid):
-    try:
-        for process in process_iter():
-            cmdline = ' '.join(process.cmdline())
-            if '--custom' in cmdline and uuid in cmdline:
-                return True
-    except BaseException:
-        pass
-
-    return False
+    if uuid in spawned_servers:
+        return spawned_servers[uuid].poll() is None
+    return get_registered_server(uuid) is not None
 
 
 def kill_server_wrapper(server_name, name, process):
     try:
-        if process is not None:
-            process.kill()
-        for process in process_iter():
-            cmdline = ' '.join(process.cmdline())
-            if '--custom' in cmdline and name in cmdline:
-                process.send_signal(SIGTERM)
-                process.kill()
+        spawned = spawned_servers.pop(name, None)
+        if process is not None and process is not spawned:
+            terminate_process(process)
+        if spawned is not None:
+            terminate_process(spawned)
+        registered = get_registered_server(name)
+        unregister_server(name)
+        if registered is not None:
+            stop_process(registered[1])
         return True
     except Exception:
         pass
     return False
 
 
+fork_servers = False
+spawned_servers = {}
+inherited_objects = []
+
+
+class ForkedProcess():
+    def __init__(self, pid):
+        self.pid = pid
+        self.returncode = None
+
+    def poll(self):
+        if self.returncode is None:
+            try:
+                pid, status = waitpid(self.pid, WNOHANG)
+                if pid == self.pid:
+                    self.returncode = -WTERMSIG(status) if WIFSIGNALED(status) else WEXITSTATUS(status)
+            except ChildProcessError:
+                self.returncode = 0
+        return self.returncode
+
+    def wait(self, timeout=None):
+        end = time() + timeout if timeout is not None else None
+        while self.poll() is None:
+            if end is not None and time() >= end:
+                raise TimeoutExpired(str(self.pid), timeout)
+            sleep(0.05)
+        return self.returncode
+
+    def send_signal(self, sig):
+        if self.poll() is None:
+            kill(self.pid, sig)
+
+    def terminate(self):
+        self.send_signal(SIGTERM)
+
+    def kill(self):
+        self.send_signal(SIGKILL)
+
+
+def preload_servers():
+    global fork_servers
+    fork_servers = True
+
+
+def reset_after_fork(server):
+    global postgres_instances_lock, sqlite_instances_lock, file_compressor
+    clear_exit_handlers()
+    signal(SIGTERM, SIG_DFL)
+    signal(SIGINT, SIG_DFL)
+    # the parent's pools, sockets and queues stay referenced so their finalizers never run in the child
+    inherited_objects.extend([dict(postgres_instances), dict(sqlite_instances), list(queue_handlers), file_compressor])
+    postgres_instances.clear()
+    sqlite_instances.clear()
+    del queue_handlers[:]
+    spawned_servers.clear()
+    postgres_instances_lock = Lock()
+    sqlite_instances_lock = Lock()
+    file_compressor = FileCompressor()
+    if getattr(server, 'logs', None) is not None:
+        inherited_objects.extend(server.logs.handlers + server.logs.filters)
+        for handler in list(server.logs.handlers):
+            server.logs.removeHandler(handler)
+        for _filter in list(server.logs.filters):
+            server.logs.removeFilter(_filter)
+        server.logs = setup_logger(server.uuid, server.config)
+    if twisted_observer is not None:
+        twisted_observer.servers = {name: logs for name, logs in twisted_observer.servers.items() if logs is server.logs}
+        twisted_observer.reactor_logs = None
+
+
+def spawn_server(server, target, args):
+    if not fork_servers:
+        spawned_servers[server.uuid] = Popen(args)
+        register_server(server.uuid, spawned_servers[server.uuid].pid, args)
+        return spawned_servers[server.uuid]
+    if hasattr(gc, 'freeze'):
+        gc.freeze()
+    pid = fork()
+    if pid == 0:
+        code = 0
+        try:
+            reset_after_fork(server)
+            target()
+        except BaseException:
+            code = 1
+        finally:
+            try:
+                run_exit_handlers()
+                stdout.flush()
+            finally:
+                _exit(code)
+    spawned_servers[server.uuid] = ForkedProcess(pid)
+    register_server(server.uuid, pid, args, getpid())
+    return spawned_servers[server.uuid]
+
+
 def get_free_port():
     port = 0
     try:
@@ -168,18 +473,69 @@ def get_free_port():
     return port
 
 
+def decode_proc_address(address):
+    host, port = address.split(':')
+    packed = bytes.fromhex(host)
+    ip = ip_address(b''.join(packed[i:i + 4][::-1] for i in range(0, len(packed), 4)))
+    if ip.version == 6 and ip.ipv4_mapped:
+        ip = ip.ipv4_mapped
+    return ip, int(port, 16)
+
+
+def get_listening_inodes(ip, port):
+    inodes = set()
+    try:
+        target = ip_address(ip)
+    except ValueError:
+        target = None
+    for table in ('/proc/net/tcp', '/proc/net/tcp6'):
+        try:
+            with open(table) as f:
+                next(f)
+                for line in f:
+                    fields = line.split()
+                    if fields[3] != '0A':
+                        continue
+                    local_ip, local_port = decode_proc_address(fields[1])
+                    if local_port == port and (target is None or target.is_unspecified or local_ip.is_unspecified or local_ip == target):
+                        inodes.add('socket:[{}]'.format(fields[9]))
+        except OSError:
+            pass
+    return inodes
+
+
+def get_port_owners(ip, port):
+    owners = set()
+    if not path.exists('/proc/net/tcp'):
+        for conn in net_connections(kind='tcp'):
+            if conn.status == CONN_LISTEN and conn.laddr.port == port and conn.pid:
+                owners.add(conn.pid)
+    else:
+        inodes = get_listening_inodes(ip, port)
+        if inodes:
+            for entry in scandir('/proc'):
+                if not entry.name.isdigit():
+                    continue
+                try:
+                    for fd in scandir(path.join(entry.path, 'fd')):
+                        if readlink(fd.path) in inodes:
+                            owners.add(int(entry.name))
+                            break
+                except OSError:
+                    pass
+    owners.discard(getpid())
+    return owners
+
+
 def close_port_wrapper(server_name, ip, port, logs):
     ret = False
     sock = socket(AF_INET, SOCK_STREAM)
     sock.settimeout(2)
     if sock.connect_ex((ip, port)) == 0:
-        for process in process_iter():
+        for pid in get_port_owners(ip, port):
             try:
-                for conn in process.connections(kind='inet'):
-                    if port == conn.laddr.port:
-                        process.send_signal(SIGTERM)
-                        process.kill()
-            except Exception:
+                stop_process(Process(pid))
+            except ProcessError:
                 pass
     try:
         sock.bind((ip, port))
@@ -190,7 +546,7 @@ def close_port_wrapper(server_name, ip, port, logs):
     if sock.connect_ex((ip, port)) != 0 and ret:
         return True
     else:
-        logs.error(['errors', {'server': server_name, 'error': 'port_open', 'type': 'Port {} still open..'.format(ip)}])
+        logs.error(ErrorEvent(server_name, 'port_open', 'Port {} still open..'.format(ip)))
         return False
 
 
@@ -204,13 +560,18 @@ class ComplexEncoder_db(JSONEncoder):
         return 'Something wrong, deleted..'
 
 
+escaped_nul = re_compile(r'(?<!\\)((?:\\\\)*)\\u0000')
+
+
 def serialize_object(_dict):
     if isinstance(_dict, Mapping):
-        return dict((k, serialize_object(v)) for k, v in _dict.items())
-    elif isinstance(_dict, list):
+        return dict((k if isinstance(k, str) else str(serialize_object(k)), serialize_object(v)) for k, v in _dict.items())
+    elif isinstance(_dict, (list, tuple)):
         return list(serialize_object(v) for v in _dict)
-    elif isinstance(_dict, (int, float)):
-        return str(_dict)
+    elif _dict is None or isinstance(_dict, (bool, int)):
+        return _dict
+    elif isinstance(_dict, float):
+        return _dict if isfinite(_dict) else str(_dict)
     elif isinstance(_dict, str):
         return _dict.replace('\x00', ' ')
     elif isinstance(_dict, bytes):
@@ -219,40 +580,1087 @@ def serialize_object(_dict):
         return repr(_dict).replace('\x00', ' ')
 
 
+def serialize_default(obj):
+    if isinstance(obj, bytes):
+        return obj.decode('utf-8', 'ignore')
+    return repr(obj)
+
+
+event_encoder = JSONEncoder(allow_nan=False, default=serialize_default)
+sorted_event_encoder = JSONEncoder(sort_keys=True, allow_nan=False, default=serialize_default)
+
+
+def serialize_event(obj, sort_keys=False):
+    encoder = sorted_event_encoder if sort_keys else event_encoder
+    try:
+        ret = encoder.encode(obj)
+    except (TypeError, ValueError):
+        ret = encoder.encode(serialize_object(obj))
+    if '\\u0000' in ret:
+        if '\\\\u0000' in ret:
+            ret = escaped_nul.sub(r'\1 ', ret)
+        else:
+            ret = ret.replace('\\u0000', ' ')
+    return ret
+
+
+class LogEvent():
+    __slots__ = ('data',)
+    table = 'servers'
+
+    def __init__(self, server, action, ip=None, port=None, extra=None):
+        data = {}
+        if server is not None:
+            data['server'] = server
+        data['action'] = action
+        if ip is not None:
+            data['ip'] = ip
+        if port is not None:
+            data['port'] = port
+        if extra:
+            data.update(extra)
+        self.data = data
+
+    @property
+    def server(self):
+        return self.data.get('server')
+
+    @property
+    def action(self):
+        return self.data.get('action')
+
+    @property
+    def ip(self):
+        return self.data.get('ip')
+
+    def as_dict(self):
+        return self.data
+
+    def __repr__(self):
+        return repr([self.table, self.data])
+
+
+class ConnectionEvent(LogEvent):
+    __slots__ = ()
+
+    def __init__(self, server, ip, port=None, extra=None):
+        data = {'server': server, 'action': 'connection'}
+        if ip is not None:
+            data['ip'] = ip
+        if port is not None:
+            data['port'] = port
+        if extra:
+            data.update(extra)
+        self.data = data
+
+
+class QueryEvent(LogEvent):
+    __slots__ = ()
+
+    def __init__(self, server, ip, port=None, action='query', extra=None):
+        data = {'server': server, 'action': action}
+        if ip is not None:
+            data['ip'] = ip
+        if port is not None:
+            data['port'] = port
+        if extra:
+            data.update(extra)
+        self.data = data
+
+
+class LoginEvent(LogEvent):
+    __slots__ = ()
+    action_name = 'login'
+
+    def __init__(self, server, status, ip, port=None, username=None, password=None, extra=None):
+        data = {'server': server, 'action': self.action_name}
+        if status is not None:
+            data['status'] = status
+        if ip is not None:
+            data['ip'] = ip
+        if port is not None:
+            data['port'] = port
+        if username is not None:
+            data['username'] = username
+        if password is not None:
+            data['password'] = password
+        if extra:
+            data.update(extra)
+        self.data = data
+
+
+class ProcessEvent(LoginEvent):
+    __slots__ = ()
+    action_name = 'process'
+
+
+class SnifferEvent(LogEvent):
+    __slots__ = ()
+    table = 'sniffer'
+
+    def __init__(self, action, ip=None, extra=None):
+        data = {'action': action}
+        if ip is not None:
+            data['ip'] = ip
+        if extra:
+            data.update(extra)
+        self.data = data
+
+
+class ErrorEvent(LogEvent):
+    __slots__ = ()
+    table = 'errors'
+
+    def __init__(self, server, error, type, extra=None):
+        data = {}
+        if server is not None:
+            data['server'] = server
+        data['error'] = error
+        data['type'] = type
+        if extra:
+            data.update(extra)
+        self.data = data
+
+
+class SessionEvent(LogEvent):
+    __slots__ = ()
+
+    def __init__(self, server, ip, port=None, extra=None):
+        data = {'server': server, 'action': 'session'}
+        if ip is not None:
+            data['ip'] = ip
+        if port is not None:
+            data['port'] = port
+        if extra:
+            data.update(extra)
+        self.data = data
+
+
+def unpack_event(msg):
+    if isinstance(msg, LogEvent):
+        return msg.table, msg.data
+    if isinstance(msg, list) and len(msg) == 2 and isinstance(msg[1], Mapping):
+        return msg[0], msg[1]
+    return None, None
+
+
+class CustomQueueListener(QueueListener):
+    def __init__(self, queue, handler, retries=2, retry_delay=0.1):
+        QueueListener.__init__(self, queue, handler, respect_handler_level=True)
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.retried = 0
+        self.failed = 0
+        self.error = False
+        handler.handleError = self.handle_error
+
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)
+
+    def handle_error(self, record):
+        self.error = True
+
+    def handle(self, record):
+        handler = self.handlers[0]
+        if record.levelno < handler.level:
+            return
+        delay = self.retry_delay
+        for attempt in range(self.retries + 1):
+            self.error = False
+            try:
+                handler.handle(record)
+            except Exception:
+                self.error = True
+            if not self.error:
+                return
+            if attempt < self.retries:
+                self.retried += 1
+                sleep(delay)
+                delay *= 2
+        self.failed += 1
+
+
+priority_classes = ('critical', 'high', 'normal', 'low')
+default_priorities = {'servers:login': 'critical', 'servers:session': 'critical', 'sniffer:creds_check': 'high', 'errors': 'high', 'system': 'high', 'servers': 'normal', 'servers:connection': 'low', 'sniffer': 'low'}
+default_shedding = {'high': {'start': 0.9, 'sample': 0.5}, 'normal': {'start': 0.75, 'sample': 0.25}, 'low': {'start': 0.5, 'sample': 0}}
+queue_handlers = []
+
+
+def get_priority(msg, priorities):
+    if isinstance(msg, LogEvent):
+        table, action = msg.table, msg.action
+    elif isinstance(msg, list) and len(msg) == 2 and isinstance(msg[1], Mapping):
+        table, action = msg[0], msg[1].get('action')
+    else:
+        return 'normal'
+    return priorities.get('{}:{}'.format(table, action)) or priorities.get(table, 'normal')
+
+
+class CustomQueueHandler(QueueHandler):
+    def __init__(self, name='', maxsize=10000, overflow='drop_new', retries=2, retry_delay=0.1, priorities=None, shedding=None):
+        QueueHandler.__init__(self, Queue(maxsize))
+        self.sink = name
+        self.maxsize = maxsize
+        self.overflow = overflow
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.priorities = priorities or default_priorities
+        self.shedding = shedding or {}
+        self.credits = dict.fromkeys(priority_classes, 0)
+        self.shed = dict.fromkeys(priority_classes, 0)
+        self.dropped = 0
+        self.listener = None
+
+    def start(self, handler):
+        self.listener = CustomQueueListener(self.queue, handler, self.retries, self.retry_delay)
+        self.listener.start()
+        queue_handlers.append(self)
+        register(self.stop)
+
+    def stop(self):
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        priority = getattr(record, 'priority', None)
+        if priority is None:
+            priority = record.priority = get_priority(record.msg, self.priorities)
+        rule = self.shedding.get(priority)
+        if rule is not None and self.maxsize and self.queue.qsize() >= rule['start'] * self.maxsize:
+            self.credits[priority] += rule['sample']
+            if self.credits[priority] < 1:
+                self.shed[priority] += 1
+                return
+            self.credits[priority] -= 1
+        if self.overflow == 'block':
+            self.queue.put(record)
+            return
+        try:
+            self.queue.put_nowait(record)
+        except Full:
+            self.dropped += 1
+            if priority == 'critical' or self.overflow == 'drop_old':
+                self.evict(record, self.overflow == 'drop_old')
+
+    def evict(self, record, oldest=False):
+        with self.queue.mutex:
+            queued = self.queue.queue
+            for index in (range(len(queued)) if oldest else range(len(queued) - 1, -1, -1)):
+                if getattr(queued[index], 'priority', 'critical') != 'critical':
+                    break
+            else:
+                if not oldest or record.priority != 'critical' or not queued or queued[0] is None:
+                    return False
+                index = 0
+            del queued[index]
+            queued.append(record)
+            return True
+
+    def stats(self):
+        stats = {'sink': self.sink, 'queue_depth': self.queue.qsize(), 'queue_size': self.maxsize, 'dropped': self.dropped, 'shed': dict(self.shed), 'retried': 0, 'failed': 0}
+        if self.listener is not None:
+            stats['retried'] = self.listener.retried
+            stats['failed'] = self.listener.failed
+        return stats
+
+
+def get_logging_stats():
+    return [queue_handler.stats() for queue_handler in queue_handlers]
+
+
+class LoggingMetrics():
+    def __init__(self, logger, queue_handlers, interval=60):
+        self.logger = logger
+        self.queue_handlers = queue_handlers
+        self.interval = interval
+        self.last = None
+        self.thread = Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def run(self):
+        while True:
+            sleep(self.interval)
+            try:
+                stats = [queue_handler.stats() for queue_handler in self.queue_handlers]
+                counters = [(item['dropped'], sum(item['shed'].values()), item['failed']) for item in stats]
+                if counters != self.last and any(any(counter) for counter in counters):
+                    self.logger.info(['system', {'type': 'logging', 'logger': self.logger.name, 'sinks': stats}])
+                self.last = counters
+            except Exception:
+                pass
+
+
+class CustomFileHandler(BaseRotatingHandler):
+    def __init__(self, filename, max_bytes=104857600, backup_count=10, interval=86400, compress=True):
+        BaseRotatingHandler.__init__(self, filename, 'a', encoding='utf-8')
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.interval = interval
+        self.compress = compress
+        self.rollover_at = time() + interval if interval else None
+
+    def format(self, record):
+        table, data = unpack_event(record.msg)
+        if table is not None:
+            return serialize_event({'date': datetime.fromtimestamp(record.created, timezone.utc).isoformat(), 'name': record.name, 'level': record.levelname, 'table': table, 'data': data})
+        return serialize_event({'date': datetime.fromtimestamp(record.created, timezone.utc).isoformat(), 'name': record.name, 'level': record.levelname, 'message': record.getMessage()})
+
+    def shouldRollover(self, record):
+        if self.stream is None:
+            self.stream = self._open()
+        if self.max_bytes and self.stream.tell() >= self.max_bytes:
+            return True
+        if self.rollover_at and time() >= self.rollover_at:
+            return True
+        return False
+
+    def doRollover(self):
+        if self.stream:
+            self.stream.close()
+            self.stream = None
+        if self.interval:
+            self.rollover_at = time() + self.interval
+        if path.exists(self.baseFilename) and path.getsize(self.baseFilename) > 0:
+            rotated = '{}.{}'.format(self.baseFilename, datetime.now().strftime('%Y%m%d-%H%M%S-%f'))
+            rename(self.baseFilename, rotated)
+            file_compressor.put((rotated if self.compress else None, self.baseFilename, self.backup_count))
+        self.stream = self._open()
+
+
+rotated_suffix = re_compile(r'\.\d{8}-\d{6}-\d{6}(\.gz)?')
+
+
+class FileCompressor():
+    def __init__(self):
+        self.queue = Queue()
+        self.thread = None
+        self.lock = Lock()
+
+    def put(self, item):
+        with self.lock:
+            if self.thread is None:
+                self.thread = Thread(target=self.run, daemon=True)
+                self.thread.start()
+        self.queue.put(item)
+
+    def run(self):
+        while True:
+            rotated, base_filename, backup_count = self.queue.get()
+            try:
+                if rotated:
+                    with open(rotated, 'rb') as f_in, gzip_open(rotated + '.gz', 'wb') as f_out:
+                        copyfileobj(f_in, f_out)
+                    remove(rotated)
+                self.remove_old(base_filename, backup_count)
+            except Exception:
+                pass
+
+    def remove_old(self, base_filename, backup_count):
+        folder, name = path.split(base_filename)
+        backups = sorted(entry.path for entry in scandir(folder) if entry.name.startswith(name + '.') and rotated_suffix.fullmatch(entry.name[len(name):]))
+        for backup in backups[:max(len(backups) - backup_count, 0)]:
+            remove(backup)
+
+
+file_compressor = FileCompressor()
+
+
+frame_header = Struct('!I')
+
+
+class BatchedSocketHandler(Handler):
+    def __init__(self, batch_size=500, flush_interval=0.5, max_buffer=100000):
+        Handler.__init__(self)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.buffer = deque(maxlen=max_buffer)
+        self.buffer_lock = Lock()
+        self.send_lock = Lock()
+        self.flush_event = Event()
+        self.sock = None
+        self.retry_delay = 0.1
+        self.dropped = 0
+        self.closed = False
+        self.thread = Thread(target=self.run, daemon=True)
+        self.thread.start()
+        register(self.close)
+
+    def emit(self, record):
+        try:
+            frame = self.format(record)
+            with self.buffer_lock:
+                if len(self.buffer) == self.buffer.maxlen:
+                    self.dropped += 1
+                self.buffer.append(frame)
+                if len(self.buffer) >= self.batch_size:
+                    self.flush_event.set()
+        except Exception:
+            self.handleError(record)
+
+    def send(self):
+        with self.send_lock:
+            with self.buffer_lock:
+                frames = [self.buffer.popleft() for _ in range(min(self.batch_size, len(self.buffer)))]
+            if not frames:
+                return False
+            try:
+                if self.sock is None:
+                    self.sock = self.connect()
+                    self.retry_delay = 0.1
+                self.sock.sendall(b''.join(frames))
+                return True
+            except Exception:
+                with self.buffer_lock:
+                    self.dropped += max(len(self.buffer) + len(frames) - self.buffer.maxlen, 0)
+                    self.buffer.extendleft(reversed(frames))
+                if self.sock is not None:
+                    self.sock.close()
+                    self.sock = None
+        if not self.closed:
+            sleep(self.retry_delay)
+            self.retry_delay = min(self.retry_delay * 2, 30)
+        return False
+
+    def run(self):
+        while not self.closed:
+            self.flush_event.wait(self.flush_interval)
+            self.flush_event.clear()
+            while self.send():
+                pass
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.flush_event.set()
+            self.thread.join(10)
+            while self.send():
+                pass
+            with self.send_lock:
+                if self.sock is not None:
+                    self.sock.close()
+                    self.sock = None
+        Handler.close(self)
+
+
+class SysLogTCPHandler(BatchedSocketHandler):
+    severities = {'DEBUG': 7, 'INFO': 6, 'WARNING': 4, 'ERROR': 3, 'CRITICAL': 2}
+
+    def __init__(self, host='localhost', port=514, facility=1, tls=False, batch_size=500, flush_interval=0.5, max_buffer=100000):
+        self.address = (host, port)
+        self.facility = self.get_facility(facility)
+        self.tls = tls
+        self.hostname = gethostname()
+        self.pid = str(getpid())
+        BatchedSocketHandler.__init__(self, batch_size, flush_interval, max_buffer)
+
+    @staticmethod
+    def get_facility(facility):
+        if facility is None or facility == '':
+            return SysLogHandler.LOG_USER
+        if isinstance(facility, int):
+            return facility
+        if str(facility).isdigit():
+            return int(facility)
+        if str(facility).lower() in SysLogHandler.facility_names:
+            return SysLogHandler.facility_names[str(facility).lower()]
+        raise ValueError('Unsupported syslog facility {}'.format(facility))
+
+    def format(self, record):
+        msgid, data = unpack_event(record.msg)
+        if msgid is not None:
+            body = serialize_event(data)
+        else:
+            msgid, body = '-', record.getMessage()
+        message = '<{}>1 {} {} {} {} {} - {}'.format(self.facility * 8 + self.severities.get(record.levelname, 6), datetime.fromtimestamp(record.created, timezone.utc).isoformat(), self.hostname, record.name[:48], self.pid, msgid, body).encode('utf-8')
+        return str(len(message)).encode('ascii') + b' ' + message
+
+    def connect(self):
+        sock = create_connection(self.address, timeout=10)
+        if self.tls:
+            sock = create_default_context().wrap_socket(sock, server_hostname=self.address[0])
+        return sock
+
+
+class CollectorHandler(BatchedSocketHandler):
+    def __init__(self, socket_path, batch_size=500, flush_interval=0.1, max_buffer=100000):
+        self.socket_path = socket_path
+        BatchedSocketHandler.__init__(self, batch_size, flush_interval, max_buffer)
+
+    def format(self, record):
+        table, data = unpack_event(record.msg)
+        if table is None:
+            data = record.getMessage()
+        frame = serialize_event([record.name, record.created, record.levelname, table, data]).encode('utf-8')
+        return frame_header.pack(len(frame)) + frame
+
+    def connect(self):
+        sock = socket(AF_UNIX, SOCK_STREAM)
+        sock.settimeout(10)
+        try:
+            sock.connect(self.socket_path)
+        except Exception:
+            sock.close()
+            raise
+        return sock
+
+
+batch_header = Struct('!IQ32s')
+batch_auth = Struct('!Q32s')
+batch_ack = Struct('!Q')
+
+
+def sign_batch(token, batch_id, payload):
+    return hmac_new(token, batch_ack.pack(batch_id) + payload, sha256).digest()
+
+
+def encode_batch(pending):
+    return compress(''.join('{}\t{}\t{}\n'.format(table, date.timestamp(), obj) for table, rows in pending.items() for date, obj in rows).encode('utf-8'))
+
+
+def decode_batch(payload, max_size=67108864):
+    decompressor = decompressobj()
+    data = decompressor.decompress(payload, max_size)
+    if decompressor.unconsumed_tail:
+        raise ValueError('Batch is larger than {} bytes'.format(max_size))
+    for line in data.decode('utf-8').splitlines():
+        table, date, obj = line.split('\t', 2)
+        yield table, float(date), obj
+
+
+class ForwarderHandler(Handler):
+    def __init__(self, host, port, tls=False, ca_file=None, batch_size=500, flush_interval=1, ack_timeout=30, spool=None, token=None, cert_file=None, key_file=None):
+        Handler.__init__(self)
+        self.address = (host, port)
+        self.tls = tls
+        self.ca_file = ca_file
+        self.cert_file = cert_file
+        self.key_file = key_file
+        self.token = (token or '').encode('utf-8')
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.ack_timeout = ack_timeout
+        self.spool = spool
+        self.buffer = {}
+        self.buffer_count = 0
+        self.buffer_lock = Lock()
+        self.flush_event = Event()
+        self.sock = None
+        self.batch_id = 0
+        self.retry_at = 0
+        self.retry_delay = 0.1
+        self.dropped = 0
+        self.closed = False
+        self.flush_thread = Thread(target=self.flush_loop, daemon=True)
+        self.flush_thread.start()
+        register(self.close)
+
+    def emit(self, record):
+        try:
+            table, data = unpack_event(record.msg)
+            if table is None:
+                return
+            pending = None
+            with self.buffer_lock:
+                self.buffer.setdefault(table, []).append((datetime.fromtimestamp(record.created, timezone.utc), serialize_event(data, sort_keys=True)))
+                self.buffer_count += 1
+                if self.buffer_count >= self.batch_size:
+                    self.flush_event.set()
+                    if self.spool is not None and self.buffer_count >= self.batch_size * 10:
+                        pending, self.buffer, self.buffer_count = self.buffer, {}, 0
+            if pending:
+                self.spool.append(pending)
+        except Exception:
+            self.handleError(record)
+
+    def connect(self):
+        if time() < self.retry_at:
+            raise ConnectionError('Collector {}:{} is backing off'.format(*self.address))
+        try:
+            sock = create_connection(self.address, timeout=10)
+            if self.tls:
+                context = create_default_context(cafile=self.ca_file)
+                if self.cert_file:
+                    context.load_cert_chain(self.cert_file, self.key_file)
+                sock = context.wrap_socket(sock, server_hostname=self.address[0])
+            sock.settimeout(self.ack_timeout)
+        except Exception:
+            self.backoff()
+            raise
+        self.sock = sock
+        self.retry_delay = 0.1
+
+    def backoff(self):
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+        self.retry_at = time() + self.retry_delay
+        self.retry_delay = min(self.retry_delay * 2, 30)
+
+    def send_batch(self, pending):
+        if self.sock is None:
+            self.connect()
+        try:
+            payload = encode_batch(pending)
+            self.batch_id += 1
+            self.sock.sendall(batch_header.pack(len(payload) + batch_auth.size, self.batch_id, sign_batch(self.token, self.batch_id, payload)) + payload)
+            ack = b''
+            while len(ack) < batch_ack.size:
+                chunk = self.sock.recv(batch_ack.size - len(ack))
+                if not chunk:
+                    raise ConnectionError('Collector {}:{} closed the connection'.format(*self.address))
+                ack += chunk
+            if batch_ack.unpack(ack)[0] != self.batch_id:
+                raise ConnectionError('Collector {}:{} acknowledged the wrong batch'.format(*self.address))
+        except Exception:
+            self.backoff()
+            raise
+
+    def flush_loop(self):
+        while not self.closed:
+            self.flush_event.wait(self.flush_interval)
+            self.flush_event.clear()
+            self.flush()
+
+    def flush(self):
+        with self.buffer_lock:
+            pending, self.buffer, self.buffer_count = self.buffer, {}, 0
+        if self.spool is not None and pending and (self.sock is None or self.spool.pending()):
+            self.spool.append(pending)
+            pending = None
+        try:
+            if pending:
+                self.send_batch(pending)
+                pending = None
+            if self.spool is not None and self.spool.pending():
+                self.spool.replay(self.send_batch, self.batch_size)
+        except Exception:
+            if pending:
+                if self.spool is not None:
+                    self.spool.append(pending)
+                else:
+                    self.dropped += sum(len(rows) for rows in pending.values())
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.flush_event.set()
+            self.flush_thread.join(self.ack_timeout)
+            self.retry_at = 0
+            self.flush()
+            if self.sock is not None:
+                self.sock.close()
+                self.sock = None
+            if self.spool is not None:
+                self.spool.close()
+        Handler.close(self)
+
+
+session_context = local()
+active_sessions = {}
+
+
+class Session():
+    __slots__ = ('id', 'server', 'ip', 'port', 'started', 'bytes_in', 'bytes_out', 'auth_attempts', 'credentials')
+
+    def __init__(self, server, ip=None, port=None):
+        self.id = uuid4().hex[:16]
+        self.server = server
+        self.ip = ip
+        self.port = port
+        self.started = time()
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.auth_attempts = 0
+        self.credentials = []
+
+    def summary(self):
+        return SessionEvent(self.server, self.ip, self.port, {'session': self.id, 'duration': round(time() - self.started, 3), 'bytes_in': self.bytes_in, 'bytes_out': self.bytes_out, 'auth_attempts': self.auth_attempts, 'credentials': self.credentials})
+
+
+class SessionProtocol(ProtocolWrapper):
+    def call(self, function, *args):
+        previous = getattr(session_context, 'session', None)
+        session_context.session = self.session
+        try:
+            return function(*args)
+        finally:
+            session_context.session = previous
+
+    def makeConnection(self, transport):
+        peer = transport.getPeer()
+        self.session = Session(self.factory.server, getattr(peer, 'host', None), getattr(peer, 'port', None))
+        self.key = (self.session.server, self.session.ip, self.session.port)
+        active_sessions[self.key] = self.session
+        self.call(ProtocolWrapper.makeConnection, self, transport)
+
+    def dataReceived(self, data):
+        self.session.bytes_in += len(data)
+        self.call(ProtocolWrapper.dataReceived, self, data)
+
+    def write(self, data):
+        self.session.bytes_out += len(data)
+        ProtocolWrapper.write(self, data)
+
+    def writeSequence(self, data):
+        self.session.bytes_out += sum(len(item) for item in data)
+        ProtocolWrapper.writeSequence(self, data)
+
+    def connectionLost(self, reason):
+        self.call(ProtocolWrapper.connectionLost, self, reason)
+        if active_sessions.get(self.key) is self.session:
+            del active_sessions[self.key]
+        self.factory.logs.info(self.session.summary())
+
+    def logPrefix(self):
+        return self.factory.server
+
+
+class SessionFactory(WrappingFactory):
+    protocol = SessionProtocol
+
+    def __init__(self, wrappedFactory, server, logs):
+        WrappingFactory.__init__(self, wrappedFactory)
+        self.server = server
+        self.logs = logs
+
+
+class SessionFilter(Filter):
+    def __init__(self, summary_only=False, max_credentials=20):
+        Filter.__init__(self)
+        self.summary_only = summary_only
+        self.max_credentials = max_credentials
+
+    def get_session(self, data):
+        server, ip, port = data.get('server'), data.get('ip'), data.get('port')
+        if port is not None:
+            return active_sessions.get((server, ip, port))
+        session = getattr(session_context, 'session', None)
+        if session is not None and session.server == server and session.ip == ip:
+            return session
+        return None
+
+    def filter(self, record):
+        if not active_sessions or getattr(record, 'aggregated', False):
+            return True
+        msg = record.msg
+        if isinstance(msg, LogEvent):
+            table, data = msg.table, msg.data
+        elif isinstance(msg, list) and len(msg) == 2 and isinstance(msg[1], Mapping):
+            table, data = msg
+        else:
+            return True
+        if table != 'servers':
+            return True
+        session = self.get_session(data)
+        if session is None:
+            return True
+        if data.get('action') == 'login':
+            session.auth_attempts += 1
+            if len(session.credentials) < self.max_credentials:
+                session.credentials.append([data.get('username'), data.get('password')])
+        if self.summary_only and table == 'servers':
+            return False
+        if isinstance(msg, LogEvent):
+            msg.data['session'] = session.id
+        else:
+            record.msg = [table, dict(msg[1], session=session.id)]
+        return True
+
+
+def compile_match(match):
+    fields = ('table', 'server', 'action')
+    conditions = []
+    for key, value in match.items():
+        if key not in fields:
+            raise ValueError('Unsupported rule match key {}'.format(key))
+        conditions.append((fields.index(key), frozenset(value if isinstance(value, list) else [value])))
+    conditions = tuple(conditions)
+    return lambda event: all(event[index] in values for index, values in conditions)
+
+
+def compile_truncate(size):
+    def truncate(value):
+        if not isinstance(value, (str, bytes)):
+            value = serialize_event(value)
+        return value[:size]
+    return truncate
+
+
+def compile_hash(salt):
+    def hash_value(value):
+        if not isinstance(value, bytes):
+            value = (value if isinstance(value, str) else serialize_event(value)).encode('utf-8')
+        return sha256(salt + value).hexdigest()
+    return hash_value
+
+
+def compile_projection(rule, salt):
+    operations = [(key, None) for key in rule.get('drop', [])]
+    operations += [(key, compile_truncate(size)) for key, size in rule.get('truncate', {}).items()]
+    operations += [(key, compile_hash(salt)) for key in rule.get('hash', [])]
+    operations = tuple(operations)
+
+    def project(data):
+        for key, operation in operations:
+            if key in data:
+                if operation is None:
+                    del data[key]
+                else:
+                    data[key] = operation(data[key])
+    return project
+
+
+class RulesFilter(Filter):
+    def __init__(self, rules):
+        Filter.__init__(self)
+        salt = rules.get('hash_salt', '').encode('utf-8')
+        self.include = tuple(compile_match(match) for match in rules.get('include', []))
+        self.exclude = tuple(compile_match(match) for match in rules.get('exclude', []))
+        self.projections = tuple((compile_match(rule['match']) if rule.get('match') else None, compile_projection(rule, salt)) for rule in rules.get('project', []))
+
+    def filter(self, record):
+        if getattr(record, 'aggregated', False):
+            return True
+        msg = record.msg
+        if isinstance(msg, LogEvent):
+            event = (msg.table, msg.server, msg.action)
+        elif isinstance(msg, list) and len(msg) == 2 and isinstance(msg[1], Mapping):
+            event = (msg[0], msg[1].get('server'), msg[1].get('action'))
+        else:
+            return True
+        if self.include and not any(match(event) for match in self.include):
+            return False
+        if any(match(event) for match in self.exclude):
+            return False
+        projections = [project for match, project in self.projections if match is None or match(event)]
+        if projections:
+            data = dict(unpack_event(msg)[1])
+            for project in projections:
+                project(data)
+            if isinstance(msg, LogEvent):
+                msg.data = data
+            else:
+                record.msg = [msg[0], data]
+        return True
+
+
+class ConnectionAggregator(Filter):
+    def __init__(self, logger, window=60, actions=None, max_keys=100000):
+        Filter.__init__(self)
+        self.logger = logger
+        self.window = window
+        self.actions = set(actions or ['connection']) - {'login'}
+        self.max_keys = max_keys
+        self.events = {}
+        self.lock = Lock()
+        self.closed = False
+        self.thread = Thread(target=self.run, daemon=True)
+        self.thread.start()
+        register(self.close)
+
+    def filter(self, record):
+        if getattr(record, 'aggregated', False):
+            return True
+        msg = record.msg
+        if isinstance(msg, LogEvent):
+            if msg.table != 'servers' or msg.action not in self.actions:
+                return True
+            key = (msg.server, msg.action, msg.ip)
+        elif isinstance(msg, list) and len(msg) == 2 and msg[0] == 'servers' and isinstance(msg[1], Mapping) and msg[1].get('action') in self.actions:
+            key = (msg[1].get('server'), msg[1]['action'], msg[1].get('ip'))
+        else:
+            return True
+        with self.lock:
+            entry = self.events.get(key)
+            if entry is not None:
+                if entry[1] is None:
+                    entry[1] = record
+                    entry[3] = record.created
+                entry[2] += 1
+                entry[4] = record.created
+                return False
+            if len(self.events) < self.max_keys:
+                self.events[key] = [record.created, None, 0, None, None]
+        return True
+
+    def flush(self, force=False):
+        now = time()
+        with self.lock:
+            expired = [key for key, entry in self.events.items() if force or now - entry[0] >= self.window]
+            entries = [self.events.pop(key) for key in expired]
+        for started, record, count, first_seen, last_seen in entries:
+            if record is None:
+                continue
+            table, data = unpack_event(record.msg)
+            record.msg = [table, dict(data, count=count, first_seen=datetime.fromtimestamp(first_seen, timezone.utc).isoformat(), last_seen=datetime.fromtimestamp(last_seen, timezone.utc).isoformat())]
+            record.aggregated = True
+            self.logger.handle(record)
+
+    def run(self):
+        while not self.closed:
+            sleep(min(self.window, 1))
+            self.flush()
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.flush(True)
+
+
 class CustomHandler(Handler):
     def __init__(self, uuid='', logs='', config=None, drop=False):
         self.db = None
         self.logs = logs
         self.uuid = uuid
         if config and config != '':
-            parsed = urlparse(config['postgres'])
-            self.db = postgres_class(host=parsed.hostname, port=parsed.port, username=parsed.username, password=parsed.password, db=parsed.path[1:], uuid=self.uuid, drop=drop)
+            self.db = get_postgres(config, self.uuid, drop)
         Handler.__init__(self)
 
     def emit(self, record):
         try:
+            table, data = unpack_event(record.msg)
+            if table is None:
+                raise ValueError('Unsupported log message')
+            serialized = None
             if 'db' in self.logs:
                 if self.db:
-                    self.db.insert_into_data_safe(record.msg[0], dumps(serialize_object(record.msg[1]), cls=ComplexEncoder))
+                    serialized = serialize_event(data, sort_keys=True)
+                    self.db.insert_into_data_batch(table, serialized, datetime.fromtimestamp(record.created, timezone.utc))
             if 'terminal' in self.logs:
-                time_now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                if record.msg[0] == 'servers':
-                    if 'server' in record.msg[1]:
-                        temp = record.msg[1]
-                        action = record.msg[1]['action']
-                        server = temp['server'].replace('server', '').replace('_', '')
-                        del temp['server']
-                        del temp['action']
-                        stdout.write('[{}] [{}] [{}] -> {}\n'.format(time_now, server, action, dumps(serialize_object(temp), sort_keys=True, cls=ComplexEncoder)))
+                if table == 'servers' and 'server' in data:
+                    time_now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                    server = data['server'].replace('server', '').replace('_', '')
+                    temp = {key: value for key, value in data.items() if key != 'server' and key != 'action'}
+                    stdout.write('[{}] [{}] [{}] -> {}\n'.format(time_now, server, data['action'], serialize_event(temp, sort_keys=True)))
             if 'syslog' in self.logs:
-                stdout.write(dumps(serialize_object(record.msg), sort_keys=True, cls=ComplexEncoder) + '\n')
-        except Exception as e:
-            stdout.write(dumps({'error': repr(e), 'logger': repr(record)}, sort_keys=True, cls=ComplexEncoder) + '\n')
-        stdout.flush()
+                if serialized is None:
+                    serialized = serialize_event(data, sort_keys=True)
+                stdout.write('[{}, {}]\n'.format(serialize_event(table), serialized))
+            stdout.flush()
+        except Exception:
+            self.handleError(record)
+
+    def handleError(self, record):
+        # sys.stderr points at devnull while helper is loaded, report sink failures on the real stderr
+        try:
+            sys.__stderr__.write(serialize_event({'error': format_exc(), 'logger': record.name, 'message': repr(record.msg)[:1024]}, sort_keys=True) + '\n')
+            sys.__stderr__.flush()
+        except Exception:
+            pass
+
+
+class EventSpool():
+    def __init__(self, location, name, segment_size=16777216, fsync='interval', fsync_interval=1):
+        self.location = path.join(location, name)
+        self.segment_size = segment_size
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        self.lock = Lock()
+        self.file = None
+        self.file_size = 0
+        self.last_fsync = 0
+        self.replay_offset = 0
+        makedirs(self.location, exist_ok=True)
+        self.lock_file = open(path.join(self.location, 'lock'), 'w')
+        flock(self.lock_file, LOCK_EX | LOCK_NB)
+        self.adopt_orphans(location)
+        self.segments = sorted(entry.name for entry in scandir(self.location) if entry.name.endswith('.spool'))
+
+    def adopt_orphans(self, location):
+        for entry in scandir(location):
+            if entry.is_dir() and entry.path != self.location:
+                try:
+                    with open(path.join(entry.path, 'lock'), 'a') as f:
+                        flock(f, LOCK_EX | LOCK_NB)
+                        for segment in scandir(entry.path):
+                            if segment.name.endswith('.spool'):
+                                rename(segment.path, path.join(self.location, segment.name))
+                        remove(path.join(entry.path, 'lock'))
+                    rmdir(entry.path)
+                except Exception:
+                    pass
+
+    def pending(self):
+        return len(self.segments) > 0
+
+    def sync(self):
+        self.file.flush()
+        if self.fsync == 'always' or (self.fsync == 'interval' and time() - self.last_fsync >= self.fsync_interval):
+            fsync(self.file.fileno())
+            self.last_fsync = time()
+
+    def close_segment(self):
+        if self.file is not None:
+            self.file.flush()
+            if self.fsync != 'never':
+                fsync(self.file.fileno())
+            self.file.close()
+            self.file = None
+
+    def append(self, pending):
+        data = ''.join('{}\t{}\t{}\n'.format(table, date.timestamp(), obj) for table, rows in pending.items() for date, obj in rows).encode('utf-8')
+        with self.lock:
+            if self.file is None or self.file_size >= self.segment_size:
+                self.close_segment()
+                name = '{:020d}-{}.spool'.format(int(time() * 1000000), getpid())
+                self.file = open(path.join(self.location, name), 'ab')
+                self.file_size = 0
+                self.segments.append(name)
+            self.file.write(data)
+            self.file_size += len(data)
+            self.sync()
+
+    def replay(self, callback, batch_size=500, limit=20):
+        while limit > 0:
+            with self.lock:
+                if not self.segments:
+                    return
+                if self.file is not None and self.file.name.endswith(self.segments[0]):
+                    self.close_segment()
+                segment = path.join(self.location, self.segments[0])
+            with open(segment, 'rb') as f:
+                f.seek(self.replay_offset)
+                while limit > 0:
+                    pending, count, size = {}, 0, 0
+                    for line in f:
+                        if not line.endswith(b'\n'):
+                            break
+                        table, date, obj = line.decode('utf-8').rstrip('\n').split('\t', 2)
+                        pending.setdefault(table, []).append((datetime.fromtimestamp(float(date), timezone.utc), obj))
+                        count += 1
+                        size += len(line)
+                        if count >= batch_size:
+                            break
+                    if count == 0:
+                        break
+                    callback(pending)
+                    self.replay_offset += size
+                    limit -= 1
+                else:
+                    return
+            with self.lock:
+                remove(segment)
+                self.segments.pop(0)
+                self.replay_offset = 0
+
+    def close(self):
+        with self.lock:
+            self.close_segment()
+
+
+def import_psycopg2():
+    global sql, connect, DatabaseError, OperationalError, InterfaceError, ThreadedConnectionPool
+    from psycopg2 import sql, connect, DatabaseError, OperationalError, InterfaceError
+    from psycopg2.pool import ThreadedConnectionPool
 
 
 class postgres_class():
-    def __init__(self, host=None, port=None, username=None, password=None, db=None, drop=False, uuid=None):
+    def __init__(self, host=None, port=None, username=None, password=None, db=None, drop=False, uuid=None, batch_size=500, flush_interval=1, pool_size=4, partitioned=False, spool=None):
+        import_psycopg2()
         self.host = host
         self.port = port
         self.username = username
@@ -260,7 +1668,23 @@ class postgres_class():
         self.db = db
         self.uuid = uuid
         self.mapped_tables = ['errors', 'servers', 'sniffer', 'system']
-        self.wait_until_up()
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.pool_size = pool_size
+        self.pool = None
+        self.buffer = {}
+        self.buffer_count = 0
+        self.buffer_lock = Lock()
+        self.flush_event = Event()
+        self.prepared = {}
+        self.partitioned = partitioned
+        self.partitions = set()
+        self.spool = spool
+        self.retry_at = 0
+        self.retry_delay = 0.1
+        self.closed = False
+        if drop or spool is None:
+            self.wait_until_up()
         if drop:
             self.con = connect(host=self.host, port=self.port, user=self.username, password=self.password)
             self.con.set_isolation_level(0)
@@ -268,26 +1692,67 @@ class postgres_class():
             self.drop_db()
             self.drop_tables()
             self.con.close()
-        self.con = connect(host=self.host, port=self.port, user=self.username, password=self.password, database=self.db)
-        self.con.set_isolation_level(0)
-        self.con.set_client_encoding('UTF8')
-        self.cur = self.con.cursor()
-        self.create_tables()
+        try:
+            self.setup_pool()
+        except Exception:
+            if self.spool is None:
+                raise
+            print('{} - postgres is not available, spooling events to {}'.format(self.uuid, self.spool.location))
+        self.flush_thread = Thread(target=self.flush_loop, daemon=True)
+        self.flush_thread.start()
+        register(self.close)
 
-    def wait_until_up(self):
-        test = True
-        while test:
+    def wait_until_up(self, delay=0.1, max_delay=5):
+        while True:
             try:
                 print('{} - Waiting on postgres connection'.format(self.uuid))
                 stdout.flush()
                 conn = connect(host=self.host, port=self.port, user=self.username, password=self.password, connect_timeout=1)
                 conn.close()
-                test = False
+                break
             except Exception:
                 pass
-            sleep(1)
+            sleep(delay)
+            delay = min(delay * 2, max_delay)
         print('{} - postgres connection is good'.format(self.uuid))
 
+    def setup_pool(self):
+        if time() < self.retry_at:
+            raise ConnectionError('postgres is not available')
+        if self.pool is not None:
+            return
+        try:
+            self.pool = ThreadedConnectionPool(1, self.pool_size, host=self.host, port=self.port, user=self.username, password=self.password, database=self.db, connect_timeout=5)
+            with self.connection() as con:
+                self.cur = con.cursor()
+                self.create_tables()
+                self.cur.close()
+            self.retry_delay = 0.1
+        except Exception:
+            if self.pool is not None:
+                self.pool.closeall()
+                self.pool = None
+            self.backoff()
+            raise
+
+    def backoff(self):
+        self.retry_at = time() + self.retry_delay
+        self.retry_delay = min(self.retry_delay * 2, 30)
+
+    @contextmanager
+    def connection(self):
+        con = self.pool.getconn()
+        try:
+            if con not in self.prepared:
+                con.set_isolation_level(0)
+                con.set_client_encoding('UTF8')
+                self.prepared[con] = set()
+            yield con
+        finally:
+            if con.closed:
+                self.prepared.pop(con, None)
+            self.pool.putconn(con, close=bool(con.closed))
+
     def addattr(self, x, val):
         self.__dict__[x] = val
 
@@ -313,21 +1778,234 @@ class postgres_class():
             self.cur.execute(sql.SQL('drop TABLE IF EXISTS {}').format(sql.Identifier(x + '_table')))
 
     def create_tables(self):
+        if self.partitioned:
+            self.create_partitioned_tables()
+            return
         for x in self.mapped_tables:
             self.cur.execute(sql.SQL('CREATE TABLE IF NOT EXISTS {} (id SERIAL NOT NULL,date timestamp with time zone DEFAULT now(),data json)').format(sql.Identifier(x + '_table')))
 
+    def create_partitioned_tables(self):
+        today = datetime.now(timezone.utc)
+        for x in self.mapped_tables:
+            table = x + '_table'
+            self.cur.execute(sql.SQL("CREATE TABLE IF NOT EXISTS {} (id BIGSERIAL NOT NULL,date timestamp with time zone NOT NULL DEFAULT now(),data jsonb,server text GENERATED ALWAYS AS (data->>'server') STORED,action text GENERATED ALWAYS AS (data->>'action') STORED,ip text GENERATED ALWAYS AS (COALESCE(data->>'ip', data->>'src_ip')) STORED,username text GENERATED ALWAYS AS (data->>'username') STORED) PARTITION BY RANGE (date)").format(sql.Identifier(table)))
+            self.cur.execute(sql.SQL('CREATE TABLE IF NOT EXISTS {} PARTITION OF {} DEFAULT').format(sql.Identifier(table + '_default'), sql.Identifier(table)))
+            for name, columns in (('date', ['date']), ('server_action_date', ['server', 'action', 'date']), ('ip_date', ['ip', 'date']), ('username', ['username'])):
+                self.cur.execute(sql.SQL('CREATE INDEX IF NOT EXISTS {} ON {} ({})').format(sql.Identifier(table + '_' + name + '_idx'), sql.Identifier(table), sql.SQL(',').join(map(sql.Identifier, columns))))
+            self.create_partitions(self.cur, x, [today, today + timedelta(days=1)])
+
+    def create_partitions(self, cur, table, dates):
+        for day in {date.astimezone(timezone.utc).date() for date in dates}:
+            if (table, day) not in self.partitions:
+                try:
+                    cur.execute(sql.SQL('CREATE TABLE IF NOT EXISTS {} PARTITION OF {} FOR VALUES FROM ({}) TO ({})').format(sql.Identifier('{}_table_p{}'.format(table, day.strftime('%Y%m%d'))), sql.Identifier(table + '_table'), sql.Literal(day.isoformat() + ' 00:00:00+00'), sql.Literal((day + timedelta(days=1)).isoformat() + ' 00:00:00+00')))
+                except Exception:
+                    stdout.write(str(format_exc()).replace('\n', ' '))
+                    stdout.flush()
+                self.partitions.add((table, day))
+
+    def execute_prepared(self, con, cur, table, rows):
+        name = 'insert_' + table
+        data_type = sql.SQL('jsonb[]' if self.partitioned else 'json[]')
+        dates = [row[0] for row in rows]
+        if self.partitioned:
+            self.create_partitions(cur, table, dates)
+        if name not in self.prepared[con]:
+            cur.execute(sql.SQL('PREPARE {} AS INSERT INTO {} (date, data) SELECT * FROM unnest($1::timestamptz[], $2::{})').format(sql.Identifier(name), sql.Identifier(table + '_table'), data_type))
+            self.prepared[con].add(name)
+        cur.execute(sql.SQL('EXECUTE {} (%s::timestamptz[], %s::{})').format(sql.Identifier(name), data_type), [dates, [row[1] for row in rows]])
+
+    def write_rows(self, pending):
+        with self.connection() as con:
+            with con.cursor() as cur:
+                for table, rows in pending.items():
+                    self.execute_prepared(con, cur, table, rows)
+
+    def replay_rows(self, pending):
+        try:
+            self.write_rows(pending)
+        except (OperationalError, InterfaceError):
+            raise
+        except DatabaseError:
+            stdout.write(str(format_exc()).replace('\n', ' '))
+            stdout.flush()
+
     def insert_into_data_safe(self, table, obj):
+        pending = {table: [(datetime.now(timezone.utc), obj)]}
         try:
-            # stdout.write(str(table))
-            self.cur.execute(
-                sql.SQL('INSERT INTO {} (id,date, data) VALUES (DEFAULT ,now(), %s)')
-                .format(sql.Identifier(table + '_table')),
-                [obj])
-            #self.cur.execute(sql.SQL('INSERT INTO errors_table (data) VALUES (%s,)'),dumps(serialize_object(obj),cls=ComplexEncoder))
+            self.setup_pool()
+            self.write_rows(pending)
         except Exception:
-            stdout.write(str(format_exc()).replace('\n', ' '))
+            if self.spool is not None:
+                self.spool.append(pending)
+            else:
+                stdout.write(str(format_exc()).replace('\n', ' '))
         stdout.flush()
 
+    def insert_into_data_batch(self, table, obj, date=None):
+        pending = None
+        with self.buffer_lock:
+            self.buffer.setdefault(table, []).append((date or datetime.now(timezone.utc), obj))
+            self.buffer_count += 1
+            if self.buffer_count >= self.batch_size:
+                self.flush_event.set()
+                if self.spool is not None and self.buffer_count >= self.batch_size * 10:
+                    pending, self.buffer, self.buffer_count = self.buffer, {}, 0
+        if pending:
+            self.spool.append(pending)
+
+    def flush_loop(self):
+        while not self.closed:
+            self.flush_event.wait(self.flush_interval)
+            self.flush_event.clear()
+            self.flush()
+
+    def flush(self):
+        with self.buffer_lock:
+            pending, self.buffer, self.buffer_count = self.buffer, {}, 0
+        if self.spool is not None and pending and (self.pool is None or self.spool.pending()):
+            self.spool.append(pending)
+            pending = None
+        try:
+            if pending or (self.spool is not None and self.spool.pending()):
+                self.setup_pool()
+                if pending:
+                    self.write_rows(pending)
+                    pending = None
+                if self.spool is not None:
+                    self.spool.replay(self.replay_rows, self.batch_size)
+        except Exception:
+            if self.pool is not None and time() >= self.retry_at:
+                self.backoff()
+                stdout.write(str(format_exc()).replace('\n', ' '))
+                stdout.flush()
+            if pending and self.spool is not None:
+                self.spool.append(pending)
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.flush_event.set()
+            self.flush()
+            if self.spool is not None:
+                self.spool.close()
+
+
+postgres_instances = {}
+postgres_instances_lock = Lock()
+
+
+def get_postgres(config, uuid=None, drop=False):
+    with postgres_instances_lock:
+        if config['postgres'] not in postgres_instances:
+            parsed = urlparse(config['postgres'])
+            spool = None
+            if config.get('db_spool', True):
+                spool = EventSpool(path.join(config.get('logs_location') or path.join(gettempdir(), 'logs'), 'spool'), uuid, config.get('db_spool_segment_size', 16777216), config.get('db_spool_fsync', 'interval'))
+            postgres_instances[config['postgres']] = postgres_class(host=parsed.hostname, port=parsed.port, username=parsed.username, password=parsed.password, db=parsed.path[1:], uuid=uuid, drop=drop, batch_size=config.get('db_batch_size', 500), flush_interval=config.get('db_flush_interval', 1), pool_size=config.get('db_pool_size', 4), partitioned='partitioned' in config.get('db_options', []), spool=spool)
+        return postgres_instances[config['postgres']]
+
+
+class sqlite_class():
+    def __init__(self, filename, batch_size=1000, flush_interval=1):
+        self.filename = filename
+        self.mapped_tables = ['errors', 'servers', 'sniffer', 'system']
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.buffer = {}
+        self.buffer_count = 0
+        self.buffer_lock = Lock()
+        self.flush_event = Event()
+        self.closed = False
+        self.con = sqlite_connect(filename, timeout=30, check_same_thread=False)
+        self.con.execute('PRAGMA journal_mode=WAL')
+        self.con.execute('PRAGMA synchronous=NORMAL')
+        self.create_tables()
+        self.flush_thread = Thread(target=self.flush_loop, daemon=True)
+        self.flush_thread.start()
+        register(self.close)
+
+    def create_tables(self):
+        with self.con:
+            for x in self.mapped_tables:
+                table = x + '_table'
+                self.con.execute('CREATE TABLE IF NOT EXISTS {} (id INTEGER PRIMARY KEY,date TEXT NOT NULL,server TEXT,action TEXT,ip TEXT,username TEXT,data TEXT)'.format(table))
+                for name, columns in (('date', 'date'), ('server_action_date', 'server,action,date'), ('ip_date', 'ip,date'), ('username', 'username')):
+                    self.con.execute('CREATE INDEX IF NOT EXISTS {}_{}_idx ON {} ({})'.format(table, name, table, columns))
+
+    def insert_into_data_batch(self, table, data, obj, date=None):
+        if table not in self.mapped_tables:
+            return
+        row = [(date or datetime.now(timezone.utc)).isoformat()]
+        for value in (data.get('server'), data.get('action'), data.get('ip') or data.get('src_ip'), data.get('username')):
+            row.append(None if value is None else str(value))
+        row.append(obj)
+        with self.buffer_lock:
+            self.buffer.setdefault(table, []).append(row)
+            self.buffer_count += 1
+            if self.buffer_count >= self.batch_size:
+                self.flush_event.set()
+
+    def flush_loop(self):
+        while not self.closed:
+            self.flush_event.wait(self.flush_interval)
+            self.flush_event.clear()
+            self.flush()
+
+    def flush(self):
+        with self.buffer_lock:
+            pending, self.buffer, self.buffer_count = self.buffer, {}, 0
+        if not pending:
+            return
+        try:
+            with self.con:
+                for table, rows in pending.items():
+                    self.con.executemany('INSERT INTO {} (date,server,action,ip,username,data) VALUES (?,?,?,?,?,?)'.format(table + '_table'), rows)
+        except SQLiteOperationalError:
+            with self.buffer_lock:
+                if self.buffer_count < self.batch_size * 10:
+                    for table, rows in pending.items():
+                        self.buffer[table] = rows + self.buffer.get(table, [])
+                        self.buffer_count += len(rows)
+            stdout.write(str(format_exc()).replace('\n', ' '))
+            stdout.flush()
+        except Exception:
+            stdout.write(str(format_exc()).replace('\n', ' '))
+            stdout.flush()
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.flush_event.set()
+            self.flush_thread.join(30)
+            self.flush()
+            self.con.close()
+
+
+sqlite_instances = {}
+sqlite_instances_lock = Lock()
+
+
+def get_sqlite(filename, batch_size=1000, flush_interval=1):
+    with sqlite_instances_lock:
+        if filename not in sqlite_instances:
+            sqlite_instances[filename] = sqlite_class(filename, batch_size, flush_interval)
+        return sqlite_instances[filename]
+
+
+class SQLiteHandler(Handler):
+    def __init__(self, filename, batch_size=1000, flush_interval=1):
+        Handler.__init__(self)
+        self.db = get_sqlite(filename, batch_size, flush_interval)
+
+    def emit(self, record):
+        try:
+            table, data = unpack_event(record.msg)
+            if table is not None:
+                self.db.insert_into_data_batch(table, data, serialize_event(data, sort_keys=True), datetime.fromtimestamp(record.created, timezone.utc))
+        except Exception:
+            self.handleError(record)
+
 
 def server_arguments():
     _server_parser = ArgumentParser(prog='Server')
@@ -17,10 +17,9 @@ from dns.resolver import query as dsnquery
 from twisted.internet import reactor
 from twisted.internet.protocol import Protocol, ClientFactory, Factory
 from twisted.python import log as tlog
-from subprocess import Popen
 from email.parser import BytesParser
 from os import path
-from honeypots.helper import close_port_wrapper, get_free_port, kill_server_wrapper, server_arguments, setup_logger, disable_logger, set_local_vars, check_if_server_is_running
+from honeypots.helper import close_port_wrapper, get_free_port, kill_server_wrapper, server_arguments, spawn_server, setup_logger, disable_logger, set_local_vars, check_if_server_is_running, ConnectionEvent, QueryEvent, ProcessEvent, ErrorEvent, SessionFactory
 from uuid import uuid4
 
 
@@ -44,9 +43,9 @@ class QHTTPProxyServer():
         self.port = port or self.port or 8080
         self.username = username or self.username or 'test'
         self.password = password or self.password or 'test'
-        disable_logger(1, tlog)
+        disable_logger(1, tlog, self.logs, 'http_proxy_server')
 
-    def http_proxy_server_main(self):
+    def http_proxy_server_main(self, run_reactor=True):
         _q_s = self
 
         class CustomProtocolParent(Protocol):
@@ -60,15 +59,17 @@ class QHTTPProxyServer():
                     _, parsed_request = request_string.split(b'\r\n', 1)
                     headers = BytesParser().parsebytes(parsed_request)
                     host = headers['host'].split(':')
-                    _q_s.logs.info(['servers', {'server': 'http_proxy_server', 'action': 'query', 'ip': self.transport.getPeer().host, 'port': self.transport.getPeer().port, 'payload': host[0]}])
+                    peer = self.transport.getPeer()
+                    _q_s.logs.info(QueryEvent('http_proxy_server', peer.host, peer.port, extra={'payload': host[0]}))
                     # return '127.0.0.1'
                     return dsnquery(host[0], 'A')[0].address
                 except Exception as e:
-                    _q_s.logs.error(['errors', {'server': 'http_proxy_server', 'error': 'resolve_domain', 'type': 'error -> ' + repr(e)}])
+                    _q_s.logs.error(ErrorEvent('http_proxy_server', 'resolve_domain', 'error -> ' + repr(e)))
                 return None
 
             def dataReceived(self, data):
-                _q_s.logs.info(['servers', {'server': 'http_proxy_server', 'action': 'connection', 'ip': self.transport.getPeer().host, 'port': self.transport.getPeer().port}])
+                peer = self.transport.getPeer()
+                _q_s.logs.info(ConnectionEvent('http_proxy_server', peer.host, peer.port))
                 try:
                     ip = self.resolve_domain(data)
                     if ip:
@@ -101,10 +102,11 @@ class QHTTPProxyServer():
 
         factory = Factory()
         factory.protocol = CustomProtocolParent
-        reactor.listenTCP(port=self.port, factory=factory, interface=self.ip)
-        reactor.run()
+        reactor.listenTCP(port=self.port, factory=SessionFactory(factory, 'http_proxy_server', self.logs), interface=self.ip)
+        if run_reactor:
+            reactor.run()
 
-    def run_server(self, process=False, auto=False):
+    def run_server(self, process=False, auto=False, run_reactor=True):
         status = 'error'
         run = False
         if process:
@@ -117,11 +119,11 @@ class QHTTPProxyServer():
                 run = True
 
             if run:
-                self.process = Popen(['python3', path.realpath(__file__), '--custom', '--ip', str(self.ip), '--port', str(self.port), '--mocking', str(self.mocking), '--config', str(self.config), '--uuid', str(self.uuid)])
+                self.process = spawn_server(self, self.http_proxy_server_main, ['python3', path.realpath(__file__), '--custom', '--ip', str(self.ip), '--port', str(self.port), '--mocking', str(self.mocking), '--config', str(self.config), '--uuid', str(self.uuid)])
                 if self.process.poll() is None and check_if_server_is_running(self.uuid):
                     status = 'success'
 
-            self.logs.info(['servers', {'server': 'http_proxy_server', 'action': 'process', 'status': status, 'ip': self.ip, 'port': self.port}])
+            self.logs.info(ProcessEvent('http_proxy_server', status, self.ip, self.port))
 
             if status == 'success':
                 return True
@@ -129,7 +131,7 @@ class QHTTPProxyServer():
                 self.kill_server()
                 return False
         else:
-            self.http_proxy_server_main()
+            self.http_proxy_server_main(run_reactor)
 
     def close_port(self):
         ret = close_port_wrapper('http_proxy_server', self.ip, self.port, self.logs)
@@ -21,9 +21,8 @@ from twisted.web.resource import Resource
 from twisted.python import log as tlog
 from random import choice
 from tempfile import gettempdir, _get_candidate_names
-from subprocess import Popen
 from os import path
-from honeypots.helper import close_port_wrapper, get_free_port, kill_server_wrapper, server_arguments, setup_logger, disable_logger, set_local_vars, check_if_server_is_running
+from honeypots.helper import close_port_wrapper, get_free_port, kill_server_wrapper, server_arguments, spawn_server, setup_logger, disable_logger, set_local_vars, check_if_server_is_running, ConnectionEvent, QueryEvent, LoginEvent, ProcessEvent, SessionFactory
 from uuid import uuid4
 
 disable_warnings()
@@ -52,9 +51,9 @@ class QHTTPServer():
         self.port = port or self.port or 80
         self.username = username or self.username or 'test'
         self.password = password or self.password or 'test'
-        disable_logger(1, tlog)
+        disable_logger(1, tlog, self.logs, 'http_server')
 
-    def http_server_main(self):
+    def http_server_main(self, run_reactor=True):
         _q_s = self
 
         class MainResource(Resource):
@@ -146,14 +145,14 @@ class QHTTPServer():
                 except BaseException:
                     pass
 
-                _q_s.logs.info(['servers', {'server': 'http_server', 'action': 'connection', 'ip': request.getClientIP(), 'request': headers}])
+                _q_s.logs.info(ConnectionEvent('http_server', request.getClientIP(), extra={'request': headers}))
 
                 if self.server != '':
                     request.responseHeaders.removeHeader('Server')
                     request.responseHeaders.addRawHeader('Server', self.server)
 
                 if request.method == b'GET':
-                    _q_s.logs.info(['servers', {'server': 'http_server', 'action': 'get', 'ip': request.getClientIP()}])
+                    _q_s.logs.info(QueryEvent('http_server', request.getClientIP(), action='get'))
                     if request.uri == b'/login.html':
                         if _q_s.username != '' and _q_s.password != '':
                             request.responseHeaders.addRawHeader('Content-Type', 'text/html; charset=utf-8')
@@ -164,7 +163,7 @@ class QHTTPServer():
 
                 elif request.method == b'POST':
                     self.headers = request.getAllHeaders()
-                    _q_s.logs.info(['servers', {'server': 'http_server', 'action': 'post', 'ip': request.getClientIP()}])
+                    _q_s.logs.info(QueryEvent('http_server', request.getClientIP(), action='post'))
                     if request.uri == b'/login.html' or b'/':
                         if _q_s.username != '' and _q_s.password != '':
                             form = FieldStorage(fp=request.content, headers=self.headers, environ={'REQUEST_METHOD': 'POST', 'CONTENT_TYPE': self.headers[b'content-type'], })
@@ -176,7 +175,7 @@ class QHTTPServer():
                                     username = _q_s.username
                                     password = _q_s.password
                                     status = 'success'
-                                _q_s.logs.info(['servers', {'server': 'http_server', 'action': 'login', 'status': status, 'ip': request.getClientIP(), 'username': username, 'password': password}])
+                                _q_s.logs.info(LoginEvent('http_server', status, request.getClientIP(), None, username, password))
 
                     request.responseHeaders.addRawHeader('Content-Type', 'text/html; charset=utf-8')
                     return self.home_file
@@ -184,10 +183,11 @@ class QHTTPServer():
                     request.responseHeaders.addRawHeader('Content-Type', 'text/html; charset=utf-8')
                     return self.home_file
 
-        reactor.listenTCP(self.port, Site(MainResource()))
-        reactor.run()
+        reactor.listenTCP(self.port, SessionFactory(Site(MainResource()), 'http_server', self.logs))
+        if run_reactor:
+            reactor.run()
 
-    def run_server(self, process=False, auto=False):
+    def run_server(self, process=False, auto=False, run_reactor=True):
         status = 'error'
         run = False
         if process:
@@ -200,11 +200,11 @@ class QHTTPServer():
                 run = True
 
             if run:
-                self.process = Popen(['python3', path.realpath(__file__), '--custom', '--ip', str(self.ip), '--port', str(self.port), '--username', str(self.username), '--password', str(self.password), '--mocking', str(self.mocking), '--config', str(self.config), '--uuid', str(self.uuid)])
+                self.process = spawn_server(self, self.http_server_main, ['python3', path.realpath(__file__), '--custom', '--ip', str(self.ip), '--port', str(self.port), '--username', str(self.username), '--password', str(self.password), '--mocking', str(self.mocking), '--config', str(self.config), '--uuid', str(self.uuid)])
                 if self.process.poll() is None and check_if_server_is_running(self.uuid):
                     status = 'success'
 
-            self.logs.info(['servers', {'server': 'http_server', 'action': 'process', 'status': status, 'ip': self.ip, 'port': self.port, 'username': self.username, 'password': self.password}])
+            self.logs.info(ProcessEvent('http_server', status, self.ip, self.port, self.username, self.password))
 
             if status == 'success':
                 return True
@@ -212,7 +212,7 @@ class QHTTPServer():
                 self.kill_server()
                 return False
         else:
-            self.http_server_main()
+            self.http_server_main(run_reactor)
 
     def close_port(self):
         ret = close_port_wrapper('http_server', self.ip, self.port, self.logs)
@@ -22,9 +22,8 @@ from twisted.web.server import Site
 from twisted.web.resource import Resource
 from random import choice
 from twisted.python import log as tlog
-from subprocess import Popen
 from os import path
-from honeypots.helper import close_port_wrapper, get_free_port, kill_server_wrapper, server_arguments, setup_logger, disable_logger, set_local_vars, check_if_server_is_running
+from honeypots.helper import close_port_wrapper, get_free_port, kill_server_wrapper, server_arguments, spawn_server, setup_logger, disable_logger, set_local_vars, check_if_server_is_running, ConnectionEvent, QueryEvent, LoginEvent, ProcessEvent, SessionFactory
 from uuid import uuid4
 
 disable_warnings()
@@ -53,7 +52,7 @@ class QHTTPSServer():
         self.port = port or self.port or 443
         self.username = username or self.username or 'test'
         self.password = password or self.password or 'test'
-        disable_logger(1, tlog)
+        disable_logger(1, tlog, self.logs, 'https_server')
 
     def CreateCert(self, host_name, key, cert):
         pk = crypto.PKey()
@@ -75,7 +74,7 @@ class QHTTPSServer():
         open(cert, 'wb').write(crypto.dump_certificate(crypto.FILETYPE_PEM, c))
         open(key, 'wb').write(crypto.dump_privatekey(crypto.FILETYPE_PEM, pk))
 
-    def https_server_main(self):
+    def https_server_main(self, run_reactor=True):
         _q_s = self
 
         class MainResource(Resource):
@@ -165,14 +164,14 @@ class QHTTPSServer():
                 except BaseException:
                     pass
 
-                _q_s.logs.info(['servers', {'server': 'https_server', 'action': 'connection', 'ip': request.getClientIP(), 'request': headers}])
+                _q_s.logs.info(ConnectionEvent('https_server', request.getClientIP(), extra={'request': headers}))
 
                 if self.server != '':
                     request.responseHeaders.removeHeader('Server')
                     request.responseHeaders.addRawHeader('Server', self.server)
 
                 if request.method == b'GET':
-                    _q_s.logs.info(['servers', {'server': 'https_server', 'action': 'get', 'ip': request.getClientIP()}])
+                    _q_s.logs.info(QueryEvent('https_server', request.getClientIP(), action='get'))
                     if request.uri == b'/login.html':
                         if _q_s.username != '' and _q_s.password != '':
                             request.responseHeaders.addRawHeader('Content-Type', 'text/html; charset=utf-8')
@@ -183,7 +182,7 @@ class QHTTPSServer():
 
                 elif request.method == b'POST':
                     self.headers = request.getAllHeaders()
-                    _q_s.logs.info(['servers', {'server': 'https_server', 'action': 'post', 'ip': request.getClientIP()}])
+                    _q_s.logs.info(QueryEvent('https_server', request.getClientIP(), action='post'))
                     if request.uri == b'/login.html' or b'/':
                         if _q_s.username != '' and _q_s.password != '':
                             form = FieldStorage(fp=request.content, headers=self.headers, environ={'REQUEST_METHOD': 'POST', 'CONTENT_TYPE': self.headers[b'content-type'], })
@@ -195,7 +194,7 @@ class QHTTPSServer():
                                     username = _q_s.username
                                     password = _q_s.password
                                     status = 'success'
-                                _q_s.logs.info(['servers', {'server': 'https_server', 'action': 'login', 'status': status, 'ip': request.getClientIP(), 'username': username, 'password': password}])
+                                _q_s.logs.info(LoginEvent('https_server', status, request.getClientIP(), None, username, password))
 
                     request.responseHeaders.addRawHeader('Content-Type', 'text/html; charset=utf-8')
                     return self.home_file
@@ -205,10 +204,11 @@ class QHTTPSServer():
 
         self.CreateCert('localhost', self.key, self.cert)
         ssl_context = ssl.DefaultOpenSSLContextFactory(self.key, self.cert)
-        reactor.listenSSL(self.port, Site(MainResource()), ssl_context)
-        reactor.run()
+        reactor.listenSSL(self.port, SessionFactory(Site(MainResource()), 'https_server', self.logs), ssl_context)
+        if run_reactor:
+            reactor.run()
 
-    def run_server(self, process=False, auto=False):
+    def run_server(self, process=False, auto=False, run_reactor=True):
         status = 'error'
         run = False
         if process:
@@ -221,11 +221,11 @@ class QHTTPSServer():
                 run = True
 
             if run:
-                self.process = Popen(['python3', path.realpath(__file__), '--custom', '--ip', str(self.ip), '--port', str(self.port), '--username', str(self.username), '--password', str(self.password), '--mocking', str(self.mocking), '--config', str(self.config), '--uuid', str(self.uuid)])
+                self.process = spawn_server(self, self.https_server_main, ['python3', path.realpath(__file__), '--custom', '--ip', str(self.ip), '--port', str(self.port), '--username', str(self.username), '--password', str(self.password), '--mocking', str(self.mocking), '--config', str(self.config), '--uuid', str(self.uuid)])
                 if self.process.poll() is None and check_if_server_is_running(self.uuid):
                     status = 'success'
 
-            self.logs.info(['servers', {'server': 'https_server', 'action': 'process', 'status': status, 'ip': self.ip, 'port': self.port, 'username': self.username, 'password': self.password}])
+            self.logs.info(ProcessEvent('https_server', status, self.ip, self.port, self.username, self.password))
 
             if status == 'success':
                 return True
@@ -233,7 +233,7 @@ class QHTTPSServer():
                 self.kill_server()
                 return False
         else:
-            self.https_server_main()
+            self.https_server_main(run_reactor)
 
     def close_port(self):
         ret = close_port_wrapper('https_server', self.ip, self.port, self.logs)
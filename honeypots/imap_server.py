@@ -18,9 +18,8 @@ from twisted.internet.protocol import Factory
 from twisted.internet import reactor
 from random import choice
 from twisted import cred
-from subprocess import Popen
 from os import path
-from honeypots.helper import check_if_server_is_running, close_port_wrapper, get_free_port, kill_server_wrapper, server_arguments, set_local_vars, setup_logger
+from honeypots.helper import check_if_server_is_running, close_port_wrapper, get_free_port, kill_server_wrapper, server_arguments, spawn_server, set_local_vars, setup_logger, ConnectionEvent, LoginEvent, ProcessEvent, SessionFactory
 from uuid import uuid4
 
 
@@ -46,7 +45,7 @@ class QIMAPServer():
         self.username = username or self.username or 'test'
         self.password = password or self.password or 'test'
 
-    def imap_server_main(self):
+    def imap_server_main(self, run_reactor=True):
 
         _q_s = self
 
@@ -59,7 +58,8 @@ class QIMAPServer():
                     return str(string)
 
             def connectionMade(self):
-                _q_s.logs.info(['servers', {'server': 'imap_server', 'action': 'connection', 'ip': self.transport.getPeer().host, 'port': self.transport.getPeer().port}])
+                peer = self.transport.getPeer()
+                _q_s.logs.info(ConnectionEvent('imap_server', peer.host, peer.port))
 
                 if isinstance(_q_s.mocking, bool):
                     if _q_s.mocking == True:
@@ -77,7 +77,8 @@ class QIMAPServer():
                     username = _q_s.username
                     password = _q_s.password
                     status = 'success'
-                _q_s.logs.info(['servers', {'server': 'imap_server', 'action': 'login', 'status': status, 'ip': self.transport.getPeer().host, 'port': self.transport.getPeer().port, 'username': username, 'password': password}])
+                peer = self.transport.getPeer()
+                _q_s.logs.info(LoginEvent('imap_server', status, peer.host, peer.port, username, password))
 
                 raise cred.error.UnauthorizedLogin()
 
@@ -100,10 +101,11 @@ class QIMAPServer():
                 return p
 
         factory = CustomIMAPFactory()
-        reactor.listenTCP(port=self.port, factory=factory, interface=self.ip)
-        reactor.run()
+        reactor.listenTCP(port=self.port, factory=SessionFactory(factory, 'imap_server', self.logs), interface=self.ip)
+        if run_reactor:
+            reactor.run()
 
-    def run_server(self, process=False, auto=False):
+    def run_server(self, process=False, auto=False, run_reactor=True):
         status = 'error'
         run = False
         if process:
@@ -116,11 +118,11 @@ class QIMAPServer():
                 run = True
 
             if run:
-                self.process = Popen(['python3', path.realpath(__file__), '--custom', '--ip', str(self.ip), '--port', str(self.port), '--username', str(self.username), '--password', str(self.password), '--mocking', str(self.mocking), '--config', str(self.config), '--uuid', str(self.uuid)])
+                self.process = spawn_server(self, self.imap_server_main, ['python3', path.realpath(__file__), '--custom', '--ip', str(self.ip), '--port', str(self.port), '--username', str(self.username), '--password', str(self.password), '--mocking', str(self.mocking), '--config', str(self.config), '--uuid', str(self.uuid)])
                 if self.process.poll() is None and check_if_server_is_running(self.uuid):
                     status = 'success'
 
-            self.logs.info(['servers', {'server': 'imap_server', 'action': 'process', 'status': status, 'ip': self.ip, 'port': self.port, 'username': self.username, 'password': self.password}])
+            self.logs.info(ProcessEvent('imap_server', status, self.ip, self.port, self.username, self.password))
 
             if status == 'success':
                 return True
@@ -128,7 +130,7 @@ class QIMAPServer():
                 self.kill_server()
                 return False
         else:
-            self.imap_server_main()
+            self.imap_server_main(run_reactor)
 
     def close_port(self):
         ret = close_port_wrapper('imap_server', self.ip, self.port, self.logs)
@@ -16,11 +16,10 @@ filterwarnings(action='ignore', module='.*OpenSSL.*')
 from twisted.internet.protocol import Protocol, Factory
 from twisted.internet import reactor
 from twisted.python import log as tlog
-from subprocess import Popen
 from os import path
 from struct import unpack
 from binascii import unhexlify
-from honeypots.helper import close_port_wrapper, get_free_port, kill_server_wrapper, server_arguments, setup_logger, disable_logger, set_local_vars, check_if_server_is_running
+from honeypots.helper import close_port_wrapper, get_free_port, kill_server_wrapper, server_arguments, spawn_server, setup_logger, disable_logger, set_local_vars, check_if_server_is_running, ConnectionEvent, LoginEvent, ProcessEvent, SessionFactory
 from uuid import uuid4
 
 
@@ -45,9 +44,9 @@ class QLDAPServer():
         self.port = port or self.port or 389
         self.username = username or self.username or 'test'
         self.password = password or self.password or 'test'
-        disable_logger(1, tlog)
+        disable_logger(1, tlog, self.logs, 'ldap_server')
 
-    def ldap_server_main(self):
+    def ldap_server_main(self, run_reactor=True):
         _q_s = self
 
         class CustomLDAProtocol(Protocol):
@@ -62,7 +61,8 @@ class QLDAPServer():
 
             def connectionMade(self):
                 self._state = 1
-                _q_s.logs.info(['servers', {'server': 'ldap_server', 'action': 'connection', 'ip': self.transport.getPeer().host, 'port': self.transport.getPeer().port}])
+                peer = self.transport.getPeer()
+                _q_s.logs.info(ConnectionEvent('ldap_server', peer.host, peer.port))
 
             def parse_ldap_packet(self, data):
 
@@ -102,10 +102,11 @@ class QLDAPServer():
                     username = self.check_bytes(username)
                     password = self.check_bytes(password)
                     if username != '' or password != '':
+                        peer = self.transport.getPeer()
                         if username == _q_s.username and password == _q_s.password:
-                            _q_s.logs.info(['servers', {'server': 'ldap_server', 'action': 'login', 'status': 'success', 'ip': self.transport.getPeer().host, 'port': self.transport.getPeer().port, 'username': _q_s.username, 'password': _q_s.password}])
+                            _q_s.logs.info(LoginEvent('ldap_server', 'success', peer.host, peer.port, _q_s.username, _q_s.password))
                         else:
-                            _q_s.logs.info(['servers', {'server': 'ldap_server', 'action': 'login', 'status': 'failed', 'ip': self.transport.getPeer().host, 'port': self.transport.getPeer().port, 'username': username, 'password': password}])
+                            _q_s.logs.info(LoginEvent('ldap_server', 'failed', peer.host, peer.port, username, password))
                     self.transport.write(unhexlify(b'300c02010165070a013204000400'))
                 elif self._state == 2:
                     self._state = 3
@@ -113,10 +114,11 @@ class QLDAPServer():
                     username = self.check_bytes(username)
                     password = self.check_bytes(password)
                     if username != '' or password != '':
+                        peer = self.transport.getPeer()
                         if username == _q_s.username and password == _q_s.password:
-                            _q_s.logs.info(['servers', {'server': 'ldap_server', 'action': 'login', 'status': 'success', 'ip': self.transport.getPeer().host, 'port': self.transport.getPeer().port, 'username': _q_s.username, 'password': _q_s.password}])
+                            _q_s.logs.info(LoginEvent('ldap_server', 'success', peer.host, peer.port, _q_s.username, _q_s.password))
                         else:
-                            _q_s.logs.info(['servers', {'server': 'ldap_server', 'action': 'login', 'status': 'failed', 'ip': self.transport.getPeer().host, 'port': self.transport.getPeer().port, 'username': username, 'password': password}])
+                            _q_s.logs.info(LoginEvent('ldap_server', 'failed', peer.host, peer.port, username, password))
                     self.transport.write(unhexlify(b'300c02010265070a013204000400'))
                 else:
                     self.transport.loseConnection()
@@ -126,10 +128,11 @@ class QLDAPServer():
 
         factory = Factory()
         factory.protocol = CustomLDAProtocol
-        reactor.listenTCP(port=self.port, factory=factory, interface=self.ip)
-        reactor.run()
+        reactor.listenTCP(port=self.port, factory=SessionFactory(factory, 'ldap_server', self.logs), interface=self.ip)
+        if run_reactor:
+            reactor.run()
 
-    def run_server(self, process=False, auto=False):
+    def run_server(self, process=False, auto=False, run_reactor=True):
         status = 'error'
         run = False
         if process:
@@ -142,11 +145,11 @@ class QLDAPServer():
                 run = True
 
             if run:
-                self.process = Popen(['python3', path.realpath(__file__), '--custom', '--ip', str(self.ip), '--port', str(self.port), '--username', str(self.username), '--password', str(self.password), '--mocking', str(self.mocking), '--config', str(self.config), '--uuid', str(self.uuid)])
+                self.process = spawn_server(self, self.ldap_server_main, ['python3', path.realpath(__file__), '--custom', '--ip', str(self.ip), '--port', str(self.port), '--username', str(self.username), '--password', str(self.password), '--mocking', str(self.mocking), '--config', str(self.config), '--uuid', str(self.uuid)])
                 if self.process.poll() is None and check_if_server_is_running(self.uuid):
                     status = 'success'
 
-            self.logs.info(['servers', {'server': 'ldap_server', 'action': 'process', 'status': status, 'ip': self.ip, 'port': self.port, 'username': self.username, 'password': self.password}])
+            self.logs.info(ProcessEvent('ldap_server', status, self.ip, self.port, self.username, self.password))
 
             if status == 'success':
                 return True
@@ -154,7 +157,7 @@ class QLDAPServer():
                 self.kill_server()
                 return False
         else:
-            self.ldap_server_main()
+            self.ldap_server_main(run_reactor)
 
     def close_port(self):
         ret = close_port_wrapper('ldap_server', self.ip, self.port, self.logs)
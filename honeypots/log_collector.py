@@ -0,0 +1,142 @@
+'''
+//  -------------------------------------------------------------
+//  author        Giga
+//  project       qeeqbox/honeypots
+//  email         gigaqeeq@gmail.com
+//  description   log_collector.py (host-local log collector)
+//  licensee      AGPL-3.0
+//  -------------------------------------------------------------
+//  contributors list qeeqbox/honeypots/graphs/contributors
+//  -------------------------------------------------------------
+'''
+
+from warnings import filterwarnings
+filterwarnings(action='ignore', module='.*OpenSSL.*')
+
+from twisted.internet.protocol import Factory
+from twisted.protocols.basic import Int32StringReceiver
+from twisted.internet import reactor, ssl
+from OpenSSL import SSL
+from twisted.python import log as tlog
+from subprocess import TimeoutExpired
+from json import load, loads
+from hmac import compare_digest
+from logging import makeLogRecord, getLevelName
+from os import path, remove
+from time import sleep
+from urllib.parse import urlparse
+from honeypots.helper import kill_server_wrapper, server_arguments, spawn_server, setup_logger, disable_logger, check_if_server_is_running, get_collector_socket, decode_batch, batch_auth, batch_ack, sign_batch, ErrorEvent
+from uuid import uuid4
+
+
+class QLogCollector():
+    def __init__(self, config=''):
+        self.process = None
+        self.uuid = 'honeypotslogger' + '_' + __class__.__name__ + '_' + str(uuid4())[:8]
+        self.config = config
+        config_data = None
+        if config:
+            with open(config) as f:
+                config_data = load(f)
+        self.socket_path = get_collector_socket(config_data)
+        self.listen = None
+        self.cert = None
+        self.key = None
+        self.ca = None
+        self.token = None
+        if config_data and config_data.get('collector_listen'):
+            self.listen = urlparse(config_data['collector_listen'])
+            self.cert = config_data.get('collector_tls_cert')
+            self.key = config_data.get('collector_tls_key')
+            self.ca = config_data.get('collector_tls_ca')
+            if config_data.get('collector_token'):
+                self.token = config_data['collector_token'].encode('utf-8')
+            if self.token is None and not (self.listen.scheme == 'tls' and self.ca):
+                raise ValueError('collector_listen requires collector_token or tls:// with collector_tls_ca')
+        self.logs = None
+
+    def handle(self, name, created, level, table, data):
+        record = makeLogRecord({'name': name, 'created': created, 'levelname': level, 'levelno': getLevelName(level), 'msg': [table, data] if table is not None else data})
+        self.logs.handle(record)
+
+    def log_collector_main(self):
+        _q_c = self
+        self.logs = setup_logger(self.uuid, self.config, collector=True)
+        disable_logger(1, tlog, self.logs, 'log_collector')
+
+        class CollectorProtocol(Int32StringReceiver):
+
+            MAX_LENGTH = 16777216
+
+            def stringReceived(self, frame):
+                try:
+                    _q_c.handle(*loads(frame.decode('utf-8')))
+                except Exception as e:
+                    _q_c.logs.error(ErrorEvent('log_collector', 'frame', 'error -> ' + repr(e)))
+
+        class ForwardedProtocol(Int32StringReceiver):
+
+            MAX_LENGTH = 16777216
+
+            def stringReceived(self, frame):
+                try:
+                    batch_id, signature = batch_auth.unpack_from(frame)
+                    payload = frame[batch_auth.size:]
+                    if _q_c.token is not None and not compare_digest(signature, sign_batch(_q_c.token, batch_id, payload)):
+                        raise ValueError('Batch signature mismatch')
+                    name = self.transport.getPeer().host
+                    for table, created, obj in decode_batch(payload):
+                        _q_c.handle(name, created, 'INFO', table, loads(obj))
+                    self.transport.write(batch_ack.pack(batch_id))
+                except Exception as e:
+                    _q_c.logs.error(ErrorEvent('log_collector', 'batch', 'error -> ' + repr(e)))
+                    self.transport.loseConnection()
+
+        factory = Factory()
+        factory.protocol = CollectorProtocol
+        if path.exists(self.socket_path):
+            remove(self.socket_path)
+        reactor.listenUNIX(self.socket_path, factory, mode=0o660)
+        if self.listen is not None:
+            forwarded_factory = Factory()
+            forwarded_factory.protocol = ForwardedProtocol
+            if self.listen.scheme == 'tls':
+                context_factory = ssl.DefaultOpenSSLContextFactory(self.key, self.cert)
+                if self.ca:
+                    context = context_factory.getContext()
+                    context.load_verify_locations(self.ca)
+                    context.set_verify(SSL.VERIFY_PEER | SSL.VERIFY_FAIL_IF_NO_PEER_CERT, lambda connection, x509, errno, depth, ok: ok)
+                reactor.listenSSL(self.listen.port or 5140, forwarded_factory, context_factory, interface=self.listen.hostname or '127.0.0.1')
+            else:
+                reactor.listenTCP(self.listen.port or 5140, forwarded_factory, interface=self.listen.hostname or '127.0.0.1')
+        reactor.run()
+
+    def run_collector(self, process=False):
+        if process:
+            self.process = spawn_server(self, self.log_collector_main, ['python3', path.realpath(__file__), '--custom', '--config', str(self.config), '--uuid', str(self.uuid)])
+            for _ in range(50):
+                if self.process.poll() is not None:
+                    return False
+                if path.exists(self.socket_path) and check_if_server_is_running(self.uuid):
+                    return True
+                sleep(0.1)
+            return False
+        else:
+            self.log_collector_main()
+        return None
+
+    def kill_collector(self):
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(10)
+            except TimeoutExpired:
+                pass
+        return kill_server_wrapper('log_collector', self.uuid, None)
+
+
+if __name__ == '__main__':
+    parsed = server_arguments()
+    if parsed.docker or parsed.aws or parsed.custom:
+        qlogcollector = QLogCollector(config=parsed.config)
+        qlogcollector.run_collector()
@@ -16,11 +16,10 @@ filterwarnings(action='ignore', module='.*OpenSSL.*')
 from twisted.internet.protocol import Protocol, Factory
 from twisted.internet import reactor
 from twisted.python import log as tlog
-from subprocess import Popen
 from os import path
 from random import randint, uniform
 from time import time
-from honeypots.helper import close_port_wrapper, get_free_port, kill_server_wrapper, server_arguments, setup_logger, disable_logger, set_local_vars, check_if_server_is_running
+from honeypots.helper import close_port_wrapper, get_free_port, kill_server_wrapper, server_arguments, spawn_server, setup_logger, disable_logger, set_local_vars, check_if_server_is_running, ConnectionEvent, QueryEvent, ProcessEvent, SessionFactory
 from uuid import uuid4
 
 
@@ -44,9 +43,9 @@ class QMemcacheServer():
         self.port = port or self.port or 11211
         self.username = username or self.username or 'test'
         self.password = password or self.password or 'test'
-        disable_logger(1, tlog)
+        disable_logger(1, tlog, self.logs, 'memcache_server')
 
-    def memcache_server_main(self):
+    def memcache_server_main(self, run_reactor=True):
         _q_s = self
 
         class CustomRedisProtocol(Protocol):
@@ -78,7 +77,8 @@ class QMemcacheServer():
                 return ret
 
             def connectionMade(self):
-                _q_s.logs.info(['servers', {'server': 'memcache_server', 'action': 'connection', 'ip': self.transport.getPeer().host, 'port': self.transport.getPeer().port}])
+                peer = self.transport.getPeer()
+                _q_s.logs.info(ConnectionEvent('memcache_server', peer.host, peer.port))
 
             def dataReceived(self, data):
                 try:
@@ -95,17 +95,19 @@ class QMemcacheServer():
                     else:
                         self.transport.write(b'ERROR\r\n')
                     if _data[0] != b'':
-                        _q_s.logs.info(['servers', {'server': 'memcache_server', 'action': _data[0].decode(), 'ip': self.transport.getPeer().host, 'port': self.transport.getPeer().port}])
+                        peer = self.transport.getPeer()
+                        _q_s.logs.info(QueryEvent('memcache_server', peer.host, peer.port, action=_data[0].decode()))
                 except BaseException:
                     pass
                 self.transport.loseConnection()
 
         factory = Factory()
         factory.protocol = CustomRedisProtocol
-        reactor.listenTCP(port=self.port, factory=factory, interface=self.ip)
-        reactor.run()
+        reactor.listenTCP(port=self.port, factory=SessionFactory(factory, 'memcache_server', self.logs), interface=self.ip)
+        if run_reactor:
+            reactor.run()
 
-    def run_server(self, process=False, auto=False):
+    def run_server(self, process=False, auto=False, run_reactor=True):
         status = 'error'
         run = False
         if process:
@@ -118,11 +120,11 @@ class QMemcacheServer():
                 run = True
 
             if run:
-                self.process = Popen(['python3', path.realpath(__file__), '--custom', '--ip', str(self.ip), '--port', str(self.port), '--mocking', str(self.mocking), '--config', str(self.config), '--uuid', str(self.uuid)])
+                self.process = spawn_server(self, self.memcache_server_main, ['python3', path.realpath(__file__), '--custom', '--ip', str(self.ip), '--port', str(self.port), '--mocking', str(self.mocking), '--config', str(self.config), '--uuid', str(self.uuid)])
                 if self.process.poll() is None and check_if_server_is_running(self.uuid):
                     status = 'success'
 
-            self.logs.info(['servers', {'server': 'memcache_server', 'action': 'process', 'status': status, 'ip': self.ip, 'port': self.port}])
+            self.logs.info(ProcessEvent('memcache_server', status, self.ip, self.port))
 
             if status == 'success':
                 return True
@@ -130,7 +132,7 @@ class QMemcacheServer():
                 self.kill_server()
                 return False
         else:
-            self.memcache_server_main()
+            self.memcache_server_main(run_reactor)
 
     def close_port(self):
         ret = close_port_wrapper('memcache_server', self.ip, self.port, self.logs)
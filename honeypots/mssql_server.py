@@ -17,11 +17,10 @@ from twisted.internet.protocol import Protocol, Factory
 from twisted.internet import reactor
 from twisted.python import log as tlog
 from struct import pack
-from subprocess import Popen
 from os import path
 from struct import unpack, pack
 from binascii import unhexlify, hexlify
-from honeypots.helper import close_port_wrapper, get_free_port, kill_server_wrapper, server_arguments, setup_logger, disable_logger, set_local_vars, check_if_server_is_running
+from honeypots.helper import close_port_wrapper, get_free_port, kill_server_wrapper, server_arguments, spawn_server, setup_logger, disable_logger, set_local_vars, check_if_server_is_running, ConnectionEvent, LoginEvent, ProcessEvent, SessionFactory
 from uuid import uuid4
 
 
@@ -46,9 +45,9 @@ class QMSSQLServer():
         self.port = port or self.port or 1433
         self.username = username or self.username or 'test'
         self.password = password or self.password or 'test'
-        disable_logger(1, tlog)
+        disable_logger(1, tlog, self.logs, 'mssql_server')
 
-    def mssql_server_main(self):
+    def mssql_server_main(self, run_reactor=True):
         _q_s = self
 
         class CustomMSSQLProtocol(Protocol):
@@ -84,7 +83,8 @@ class QMSSQLServer():
 
             def connectionMade(self):
                 self._state = 1
-                _q_s.logs.info(['servers', {'server': 'mssql_server', 'action': 'connection', 'ip': self.transport.getPeer().host, 'port': self.transport.getPeer().port}])
+                peer = self.transport.getPeer()
+                _q_s.logs.info(ConnectionEvent('mssql_server', peer.host, peer.port))
 
             def dataReceived(self, data):
                 if self._state == 1:
@@ -107,7 +107,8 @@ class QMSSQLServer():
                             username = _q_s.username
                             password = _q_s.password
                             status = 'success'
-                        _q_s.logs.info(['servers', {'server': 'mssql_server', 'action': 'login', 'status': status, 'ip': self.transport.getPeer().host, 'port': self.transport.getPeer().port, 'username': username, 'password': password}])
+                        peer = self.transport.getPeer()
+                        _q_s.logs.info(LoginEvent('mssql_server', status, peer.host, peer.port, username, password))
 
                         self.transport.write(unhexlify(self.create_payload(token_error_msg=b'Login Failed', error_code=18456)))
                 else:
@@ -118,10 +119,11 @@ class QMSSQLServer():
 
         factory = Factory()
         factory.protocol = CustomMSSQLProtocol
-        reactor.listenTCP(port=self.port, factory=factory, interface=self.ip)
-        reactor.run()
+        reactor.listenTCP(port=self.port, factory=SessionFactory(factory, 'mssql_server', self.logs), interface=self.ip)
+        if run_reactor:
+            reactor.run()
 
-    def run_server(self, process=False, auto=False):
+    def run_server(self, process=False, auto=False, run_reactor=True):
         status = 'error'
         run = False
         if process:
@@ -134,11 +136,11 @@ class QMSSQLServer():
                 run = True
 
             if run:
-                self.process = Popen(['python3', path.realpath(__file__), '--custom', '--ip', str(self.ip), '--port', str(self.port), '--username', str(self.username), '--password', str(self.password), '--mocking', str(self.mocking), '--config', str(self.config), '--uuid', str(self.uuid)])
+                self.process = spawn_server(self, self.mssql_server_main, ['python3', path.realpath(__file__), '--custom', '--ip', str(self.ip), '--port', str(self.port), '--username', str(self.username), '--password', str(self.password), '--mocking', str(self.mocking), '--config', str(self.config), '--uuid', str(self.uuid)])
                 if self.process.poll() is None and check_if_server_is_running(self.uuid):
                     status = 'success'
 
-            self.logs.info(['servers', {'server': 'mssql_server', 'action': 'process', 'status': status, 'ip': self.ip, 'port': self.port, 'username': self.username, 'password': self.password}])
+            self.logs.info(ProcessEvent('mssql_server', status, self.ip, self.port, self.username, self.password))
 
             if status == 'success':
                 return True
@@ -146,7 +148,7 @@ class QMSSQLServer():
                 self.kill_server()
                 return False
         else:
-            self.mssql_server_main()
+            self.mssql_server_main(run_reactor)
 
     def close_port(self):
         ret = close_port_wrapper('mssql_server', self.ip, self.port, self.logs)
@@ -18,9 +18,8 @@ from twisted.internet import reactor
 from twisted.python import log as tlog
 from struct import pack
 from hashlib import sha1
-from subprocess import Popen
 from os import path
-from honeypots.helper import close_port_wrapper, get_free_port, kill_server_wrapper, server_arguments, setup_logger, disable_logger, set_local_vars, check_if_server_is_running
+from honeypots.helper import close_port_wrapper, get_free_port, kill_server_wrapper, server_arguments, spawn_server, setup_logger, disable_logger, set_local_vars, check_if_server_is_running, ConnectionEvent, LoginEvent, ProcessEvent, SessionFactory
 from uuid import uuid4
 
 
@@ -51,7 +50,7 @@ class QMysqlServer():
         else:
             self.load_words()
 
-        disable_logger(1, tlog)
+        disable_logger(1, tlog, self.logs, 'mysql_server')
 
     def load_words(self,):
         with open(self.file_name, 'r', encoding='utf-8') as file:
@@ -110,7 +109,7 @@ class QMysqlServer():
 
         return None
 
-    def mysql_server_main(self):
+    def mysql_server_main(self, run_reactor=True):
         _q_s = self
 
         class CustomMysqlProtocol(Protocol):
@@ -129,7 +128,8 @@ class QMysqlServer():
             def connectionMade(self):
                 self._state = 1
                 self.transport.write(_q_s.greeting())
-                _q_s.logs.info(['servers', {'server': 'mysql_server', 'action': 'connection', 'ip': self.transport.getPeer().host, 'port': self.transport.getPeer().port}])
+                peer = self.transport.getPeer()
+                _q_s.logs.info(ConnectionEvent('mysql_server', peer.host, peer.port))
 
             def dataReceived(self, data):
                 try:
@@ -150,7 +150,8 @@ class QMysqlServer():
                             else:
                                 ret_access_denied = True
                                 password = ':'.join(hex((c))[2:] for c in data)
-                        _q_s.logs.info(['servers', {'server': 'mysql_server', 'action': 'login', 'status': status, 'ip': self.transport.getPeer().host, 'port': self.transport.getPeer().port, 'username': username, 'password': password}])
+                        peer = self.transport.getPeer()
+                        _q_s.logs.info(LoginEvent('mysql_server', status, peer.host, peer.port, username, password))
 
                         if ret_access_denied:
                             self.transport.write(_q_s.access_denied())
@@ -167,10 +168,11 @@ class QMysqlServer():
 
         factory = Factory()
         factory.protocol = CustomMysqlProtocol
-        reactor.listenTCP(port=self.port, factory=factory, interface=self.ip)
-        reactor.run()
+        reactor.listenTCP(port=self.port, factory=SessionFactory(factory, 'mysql_server', self.logs), interface=self.ip)
+        if run_reactor:
+            reactor.run()
 
-    def run_server(self, process=False, auto=False):
+    def run_server(self, process=False, auto=False, run_reactor=True):
         status = 'error'
         run = False
         if process:
@@ -183,11 +185,11 @@ class QMysqlServer():
                 run = True
 
             if run:
-                self.process = Popen(['python3', path.realpath(__file__), '--custom', '--ip', str(self.ip), '--port', str(self.port), '--username', str(self.username), '--password', str(self.password), '--mocking', str(self.mocking), '--config', str(self.config), '--uuid', str(self.uuid)])
+                self.process = spawn_server(self, self.mysql_server_main, ['python3', path.realpath(__file__), '--custom', '--ip', str(self.ip), '--port', str(self.port), '--username', str(self.username), '--password', str(self.password), '--mocking', str(self.mocking), '--config', str(self.config), '--uuid', str(self.uuid)])
                 if self.process.poll() is None and check_if_server_is_running(self.uuid):
                     status = 'success'
 
-            self.logs.info(['servers', {'server': 'mysql_server', 'action': 'process', 'status': status, 'ip': self.ip, 'port': self.port, 'username': self.username, 'password': self.password}])
+            self.logs.info(ProcessEvent('mysql_server', status, self.ip, self.port, self.username, self.password))
 
             if status == 'success':
                 return True
@@ -195,7 +197,7 @@ class QMysqlServer():
                 self.kill_server()
                 return False
         else:
-            self.mysql_server_main()
+            self.mysql_server_main(run_reactor)
 
     def close_port(self):
         ret = close_port_wrapper('mysql_server', self.ip, self.port, self.logs)
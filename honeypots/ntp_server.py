@@ -18,9 +18,8 @@ from twisted.internet import reactor
 from struct import unpack, calcsize, pack
 from time import time
 from twisted.python import log as tlog
-from subprocess import Popen
 from os import path
-from honeypots.helper import close_port_wrapper, get_free_port, kill_server_wrapper, server_arguments, setup_logger, disable_logger, set_local_vars, check_if_server_is_running
+from honeypots.helper import close_port_wrapper, get_free_port, kill_server_wrapper, server_arguments, spawn_server, setup_logger, disable_logger, set_local_vars, check_if_server_is_running, ConnectionEvent, QueryEvent, ProcessEvent
 from uuid import uuid4
 
 
@@ -44,9 +43,9 @@ class QNTPServer():
         self.port = port or self.port or 123
         self.username = username or self.username or 'test'
         self.password = password or self.password or 'test'
-        disable_logger(1, tlog)
+        disable_logger(1, tlog, self.logs, 'ntp_server')
 
-    def ntp_server_main(self):
+    def ntp_server_main(self, run_reactor=True):
         _q_s = self
 
         class CustomDatagramProtocolProtocol(DatagramProtocol):
@@ -65,7 +64,7 @@ class QNTPServer():
                 mode = 'UnKnown'
                 success = False
                 unpacked = None
-                _q_s.logs.info(['servers', {'server': 'ntp_server', 'action': 'connection', 'ip': addr[0], 'port': addr[1]}])
+                _q_s.logs.info(ConnectionEvent('ntp_server', addr[0], addr[1]))
                 if len(data) == calcsize('!B B B b I I I Q Q Q Q'):
                     version = data[0] >> 3 & 0x7
                     mode = data[0] & 0x7
@@ -77,16 +76,17 @@ class QNTPServer():
                         success = True
 
                 if success:
-                    _q_s.logs.info(['servers', {'server': 'ntp_server', 'action': 'query', 'status': 'success', 'ip': addr[0], 'port': addr[1], 'version': version, 'mode': mode}])
+                    _q_s.logs.info(QueryEvent('ntp_server', addr[0], addr[1], extra={'status': 'success', 'version': version, 'mode': mode}))
                 else:
-                    _q_s.logs.info(['servers', {'server': 'ntp_server', 'action': 'query', 'status': 'fail', 'ip': addr[0], 'port': addr[1], 'version': version, 'mode': mode}])
+                    _q_s.logs.info(QueryEvent('ntp_server', addr[0], addr[1], extra={'status': 'fail', 'version': version, 'mode': mode}))
 
                 self.transport.loseConnection()
 
         reactor.listenUDP(port=self.port, protocol=CustomDatagramProtocolProtocol(), interface=self.ip)
-        reactor.run()
+        if run_reactor:
+            reactor.run()
 
-    def run_server(self, process=False, auto=False):
+    def run_server(self, process=False, auto=False, run_reactor=True):
         status = 'error'
         run = False
         if process:
@@ -99,11 +99,11 @@ class QNTPServer():
                 run = True
 
             if run:
-                self.process = Popen(['python3', path.realpath(__file__), '--custom', '--ip', str(self.ip), '--port', str(self.port), '--mocking', str(self.mocking), '--config', str(self.config), '--uuid', str(self.uuid)])
+                self.process = spawn_server(self, self.ntp_server_main, ['python3', path.realpath(__file__), '--custom', '--ip', str(self.ip), '--port', str(self.port), '--mocking', str(self.mocking), '--config', str(self.config), '--uuid', str(self.uuid)])
                 if self.process.poll() is None and check_if_server_is_running(self.uuid):
                     status = 'success'
 
-            self.logs.info(['servers', {'server': 'ntp_server', 'action': 'process', 'status': status, 'ip': self.ip, 'port': self.port}])
+            self.logs.info(ProcessEvent('ntp_server', status, self.ip, self.port))
 
             if status == 'success':
                 return True
@@ -111,7 +111,7 @@ class QNTPServer():
                 self.kill_server()
                 return False
         else:
-            self.ntp_server_main()
+            self.ntp_server_main(run_reactor)
 
     def close_port(self):
         ret = close_port_wrapper('ntp_server', self.ip, self.port, self.logs)
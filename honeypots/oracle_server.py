@@ -16,11 +16,10 @@ filterwarnings(action='ignore', module='.*OpenSSL.*')
 from twisted.internet.protocol import Protocol, Factory
 from twisted.internet import reactor
 from twisted.python import log as tlog
-from subprocess import Popen
 from os import path
 from struct import unpack
 from re import findall
-from honeypots.helper import close_port_wrapper, get_free_port, kill_server_wrapper, server_arguments, setup_logger, disable_logger, set_local_vars, check_if_server_is_running, set_local_vars
+from honeypots.helper import close_port_wrapper, get_free_port, kill_server_wrapper, server_arguments, spawn_server, setup_logger, disable_logger, set_local_vars, check_if_server_is_running, set_local_vars, ConnectionEvent, LoginEvent, ProcessEvent, SessionFactory
 from uuid import uuid4
 
 
@@ -44,9 +43,9 @@ class QOracleServer():
         self.port = port or self.port or 1521
         self.username = username or self.username or 'test'
         self.password = password or self.password or 'test'
-        disable_logger(1, tlog)
+        disable_logger(1, tlog, self.logs, 'oracle_server')
 
-    def oracle_server_main(self):
+    def oracle_server_main(self, run_reactor=True):
         _q_s = self
 
         class CustomRedisProtocol(Protocol):
@@ -88,21 +87,24 @@ class QOracleServer():
                 return service_name, program, local_user
 
             def connectionMade(self):
-                _q_s.logs.info(['servers', {'server': 'oracle_server', 'action': 'connection', 'ip': self.transport.getPeer().host, 'port': self.transport.getPeer().port}])
+                peer = self.transport.getPeer()
+                _q_s.logs.info(ConnectionEvent('oracle_server', peer.host, peer.port))
 
             def dataReceived(self, data):
                 service_name, program, local_user = self.parse_payload(data)
                 if service_name or program or local_user:
-                    _q_s.logs.info(['servers', {'server': 'oracle_server', 'action': 'login', 'ip': self.transport.getPeer().host, 'port': self.transport.getPeer().port, 'local_user': local_user, 'program': program, 'service_name': service_name}])
+                    peer = self.transport.getPeer()
+                    _q_s.logs.info(LoginEvent('oracle_server', None, peer.host, peer.port, extra={'local_user': local_user, 'program': program, 'service_name': service_name}))
                 self.transport.write(self.refuse_payload())
                 self.transport.loseConnection()
 
         factory = Factory()
         factory.protocol = CustomRedisProtocol
-        reactor.listenTCP(port=self.port, factory=factory, interface=self.ip)
-        reactor.run()
+        reactor.listenTCP(port=self.port, factory=SessionFactory(factory, 'oracle_server', self.logs), interface=self.ip)
+        if run_reactor:
+            reactor.run()
 
-    def run_server(self, process=False, auto=False):
+    def run_server(self, process=False, auto=False, run_reactor=True):
         status = 'error'
         run = False
         if process:
@@ -115,11 +117,11 @@ class QOracleServer():
                 run = True
 
             if run:
-                self.process = Popen(['python3', path.realpath(__file__), '--custom', '--ip', str(self.ip), '--port', str(self.port), '--mocking', str(self.mocking), '--config', str(self.config), '--uuid', str(self.uuid)])
+                self.process = spawn_server(self, self.oracle_server_main, ['python3', path.realpath(__file__), '--custom', '--ip', str(self.ip), '--port', str(self.port), '--mocking', str(self.mocking), '--config', str(self.config), '--uuid', str(self.uuid)])
                 if self.process.poll() is None and check_if_server_is_running(self.uuid):
                     status = 'success'
 
-            self.logs.info(['servers', {'server': 'oracle_server', 'action': 'process', 'status': status, 'ip': self.ip, 'port': self.port}])
+            self.logs.info(ProcessEvent('oracle_server', status, self.ip, self.port))
 
             if status == 'success':
                 return True
@@ -127,7 +129,7 @@ class QOracleServer():
                 self.kill_server()
                 return False
         else:
-            self.oracle_server_main()
+            self.oracle_server_main(run_reactor)
 
     def close_port(self):
         ret = close_port_wrapper('oracle_server', self.ip, self.port, self.logs)
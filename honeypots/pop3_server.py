@@ -18,9 +18,8 @@ from twisted.internet.protocol import Factory
 from twisted.internet import reactor
 from random import choice
 from twisted.python import log as tlog
-from subprocess import Popen
 from os import path
-from honeypots.helper import close_port_wrapper, get_free_port, kill_server_wrapper, server_arguments, setup_logger, disable_logger, set_local_vars, check_if_server_is_running
+from honeypots.helper import close_port_wrapper, get_free_port, kill_server_wrapper, server_arguments, spawn_server, setup_logger, disable_logger, set_local_vars, check_if_server_is_running, ConnectionEvent, LoginEvent, ProcessEvent, SessionFactory
 from uuid import uuid4
 
 
@@ -45,9 +44,9 @@ class QPOP3Server():
         self.port = port or self.port or 110
         self.username = username or self.username or 'test'
         self.password = password or self.password or 'test'
-        disable_logger(1, tlog)
+        disable_logger(1, tlog, self.logs, 'pop3_server')
 
-    def pop3_server_main(self):
+    def pop3_server_main(self, run_reactor=True):
         _q_s = self
 
         class CustomPOP3Protocol(POP3):
@@ -61,7 +60,8 @@ class QPOP3Server():
                     return str(string)
 
             def connectionMade(self):
-                _q_s.logs.info(['servers', {'server': 'pop3_server', 'action': 'connection', 'ip': self.transport.getPeer().host, 'port': self.transport.getPeer().port}])
+                peer = self.transport.getPeer()
+                _q_s.logs.info(ConnectionEvent('pop3_server', peer.host, peer.port))
                 self._user = None
                 if isinstance(_q_s.mocking, bool):
                     if _q_s.mocking == True:
@@ -84,7 +84,8 @@ class QPOP3Server():
                         username = _q_s.username
                         password = _q_s.password
                         status = 'success'
-                    _q_s.logs.info(['servers', {'server': 'pop3_server', 'action': 'login', 'status': status, 'ip': self.transport.getPeer().host, 'port': self.transport.getPeer().port, 'username': username, 'password': password}])
+                    peer = self.transport.getPeer()
+                    _q_s.logs.info(LoginEvent('pop3_server', status, peer.host, peer.port, username, password))
                     self.failResponse('Authentication failed')
                 else:
                     self.failResponse('USER first, then PASS')
@@ -108,10 +109,11 @@ class QPOP3Server():
                 return p
 
         factory = CustomPOP3Factory()
-        reactor.listenTCP(port=self.port, factory=factory, interface=self.ip)
-        reactor.run()
+        reactor.listenTCP(port=self.port, factory=SessionFactory(factory, 'pop3_server', self.logs), interface=self.ip)
+        if run_reactor:
+            reactor.run()
 
-    def run_server(self, process=False, auto=False):
+    def run_server(self, process=False, auto=False, run_reactor=True):
         status = 'error'
         run = False
         if process:
@@ -124,11 +126,11 @@ class QPOP3Server():
                 run = True
 
             if run:
-                self.process = Popen(['python3', path.realpath(__file__), '--custom', '--ip', str(self.ip), '--port', str(self.port), '--username', str(self.username), '--password', str(self.password), '--mocking', str(self.mocking), '--config', str(self.config), '--uuid', str(self.uuid)])
+                self.process = spawn_server(self, self.pop3_server_main, ['python3', path.realpath(__file__), '--custom', '--ip', str(self.ip), '--port', str(self.port), '--username', str(self.username), '--password', str(self.password), '--mocking', str(self.mocking), '--config', str(self.config), '--uuid', str(self.uuid)])
                 if self.process.poll() is None and check_if_server_is_running(self.uuid):
                     status = 'success'
 
-            self.logs.info(['servers', {'server': 'pop3_server', 'action': 'process', 'status': status, 'ip': self.ip, 'port': self.port, 'username': self.username, 'password': self.password}])
+            self.logs.info(ProcessEvent('pop3_server', status, self.ip, self.port, self.username, self.password))
 
             if status == 'success':
                 return True
@@ -136,7 +138,7 @@ class QPOP3Server():
                 self.kill_server()
                 return False
         else:
-            self.pop3_server_main()
+            self.pop3_server_main(run_reactor)
 
     def close_port(self):
         ret = close_port_wrapper('pop3_server', self.ip, self.port, self.logs)
@@ -17,9 +17,8 @@ from twisted.internet.protocol import Protocol, Factory
 from twisted.internet import reactor
 from struct import unpack
 from twisted.python import log as tlog
-from subprocess import Popen
 from os import path
-from honeypots.helper import close_port_wrapper, get_free_port, kill_server_wrapper, server_arguments, setup_logger, disable_logger, set_local_vars, check_if_server_is_running
+from honeypots.helper import close_port_wrapper, get_free_port, kill_server_wrapper, server_arguments, spawn_server, setup_logger, disable_logger, set_local_vars, check_if_server_is_running, ConnectionEvent, LoginEvent, ProcessEvent, SessionFactory
 from uuid import uuid4
 
 
@@ -43,9 +42,9 @@ class QPostgresServer():
         self.port = port or self.port or 5432
         self.username = username or self.username or 'test'
         self.password = password or self.password or 'test'
-        disable_logger(1, tlog)
+        disable_logger(1, tlog, self.logs, 'postgres_server')
 
-    def postgres_server_main(self):
+    def postgres_server_main(self, run_reactor=True):
         _q_s = self
 
         class CustomPostgresProtocol(Protocol):
@@ -72,7 +71,8 @@ class QPostgresServer():
             def connectionMade(self):
                 self._state = 1
                 self._variables = {}
-                _q_s.logs.info(['servers', {'server': 'postgres_server', 'action': 'connection', 'ip': self.transport.getPeer().host, 'port': self.transport.getPeer().port}])
+                peer = self.transport.getPeer()
+                _q_s.logs.info(ConnectionEvent('postgres_server', peer.host, peer.port))
 
             def dataReceived(self, data):
                 if self._state == 1:
@@ -92,7 +92,8 @@ class QPostgresServer():
                             username = _q_s.username
                             password = _q_s.password
                             status = 'success'
-                        _q_s.logs.info(['servers', {'server': 'postgres_server', 'action': 'login', 'status': status, 'ip': self.transport.getPeer().host, 'port': self.transport.getPeer().port, 'username': username, 'password': password}])
+                        peer = self.transport.getPeer()
+                        _q_s.logs.info(LoginEvent('postgres_server', status, peer.host, peer.port, username, password))
 
                     self.transport.loseConnection()
                 else:
@@ -104,10 +105,11 @@ class QPostgresServer():
 
         factory = Factory()
         factory.protocol = CustomPostgresProtocol
-        reactor.listenTCP(port=self.port, factory=factory, interface=self.ip)
-        reactor.run()
+        reactor.listenTCP(port=self.port, factory=SessionFactory(factory, 'postgres_server', self.logs), interface=self.ip)
+        if run_reactor:
+            reactor.run()
 
-    def run_server(self, process=False, auto=False):
+    def run_server(self, process=False, auto=False, run_reactor=True):
         status = 'error'
         run = False
         if process:
@@ -120,11 +122,11 @@ class QPostgresServer():
                 run = True
 
             if run:
-                self.process = Popen(['python3', path.realpath(__file__), '--custom', '--ip', str(self.ip), '--port', str(self.port), '--username', str(self.username), '--password', str(self.password), '--mocking', str(self.mocking), '--config', str(self.config), '--uuid', str(self.uuid)])
+                self.process = spawn_server(self, self.postgres_server_main, ['python3', path.realpath(__file__), '--custom', '--ip', str(self.ip), '--port', str(self.port), '--username', str(self.username), '--password', str(self.password), '--mocking', str(self.mocking), '--config', str(self.config), '--uuid', str(self.uuid)])
                 if self.process.poll() is None and check_if_server_is_running(self.uuid):
                     status = 'success'
 
-            self.logs.info(['servers', {'server': 'postgres_server', 'action': 'process', 'status': status, 'ip': self.ip, 'port': self.port, 'username': self.username, 'password': self.password}])
+            self.logs.info(ProcessEvent('postgres_server', status, self.ip, self.port, self.username, self.password))
 
             if status == 'success':
                 return True
@@ -132,7 +134,7 @@ class QPostgresServer():
                 self.kill_server()
                 return False
         else:
-            self.postgres_server_main()
+            self.postgres_server_main(run_reactor)
 
     def close_port(self):
         ret = close_port_wrapper('postgres_server', self.ip, self.port, self.logs)
@@ -21,8 +21,7 @@ from shutil import rmtree
 from impacket.ntlm import compute_lmhash, compute_nthash
 from logging import DEBUG, getLogger
 from os import path
-from subprocess import Popen
-from honeypots.helper import check_if_server_is_running, close_port_wrapper, get_free_port, kill_server_wrapper, server_arguments, set_local_vars, setup_logger
+from honeypots.helper import check_if_server_is_running, close_port_wrapper, get_free_port, kill_server_wrapper, server_arguments, spawn_server, set_local_vars, setup_logger, ConnectionEvent, LoginEvent, ProcessEvent, ErrorEvent
 from uuid import uuid4
 
 #loggers = [logging.getLogger(name) for name in logging.root.manager.loggerDict]
@@ -65,13 +64,13 @@ class QSMBServer():
                 # sys.stdout.flush()
                 try:
                     if 'Incoming connection' in message.strip() or 'AUTHENTICATE_MESSAGE' in message.strip() or 'authenticated successfully' in message.strip():
-                        _q_s.logs.info(['servers', {'server': 'smb_server', 'action': 'connection', 'msg': message.strip()}])
+                        _q_s.logs.info(ConnectionEvent('smb_server', None, extra={'msg': message.strip()}))
                     elif ':4141414141414141:' in message.strip():
                         parsed = message.strip().split(':')
                         if len(parsed) > 2:
-                            _q_s.logs.info(['servers', {'server': 'smb_server', 'action': 'login', 'workstation': parsed[0], 'test':parsed[1]}])
+                            _q_s.logs.info(LoginEvent('smb_server', None, None, extra={'workstation': parsed[0], 'test': parsed[1]}))
                 except Exception as e:
-                    _q_s.logs.error(['errors', {'server': 'smb_server', 'error': 'write', 'type': 'error -> ' + repr(e)}])
+                    _q_s.logs.error(ErrorEvent('smb_server', 'write', 'error -> ' + repr(e)))
 
         handler = StreamHandler(Logger())
         getLogger('impacket').addHandler(handler)
@@ -107,11 +106,11 @@ class QSMBServer():
                 run = True
 
             if run:
-                self.process = Popen(['python3', path.realpath(__file__), '--custom', '--ip', str(self.ip), '--port', str(self.port), '--username', str(self.username), '--password', str(self.password), '--folders', str(self.folders), '--mocking', str(self.mocking), '--config', str(self.config), '--uuid', str(self.uuid)])
+                self.process = spawn_server(self, self.smb_server_main, ['python3', path.realpath(__file__), '--custom', '--ip', str(self.ip), '--port', str(self.port), '--username', str(self.username), '--password', str(self.password), '--folders', str(self.folders), '--mocking', str(self.mocking), '--config', str(self.config), '--uuid', str(self.uuid)])
                 if self.process.poll() is None and check_if_server_is_running(self.uuid):
                     status = 'success'
 
-            self.logs.info(['servers', {'server': 'smb_server', 'action': 'process', 'status': status, 'ip': self.ip, 'port': self.port, 'username': self.username, 'password': self.password, 'folders': str(self.folders)}])
+            self.logs.info(ProcessEvent('smb_server', status, self.ip, self.port, self.username, self.password, extra={'folders': str(self.folders)}))
 
             if status == 'success':
                 return True
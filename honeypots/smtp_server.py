@@ -17,8 +17,7 @@ from smtpd import SMTPChannel, SMTPServer
 from asyncore import loop
 from base64 import b64decode
 from os import path
-from subprocess import Popen
-from honeypots.helper import check_if_server_is_running, close_port_wrapper, get_free_port, kill_server_wrapper, server_arguments, set_local_vars, setup_logger
+from honeypots.helper import check_if_server_is_running, close_port_wrapper, get_free_port, kill_server_wrapper, server_arguments, spawn_server, set_local_vars, setup_logger, ConnectionEvent, LoginEvent, ProcessEvent, ErrorEvent
 from uuid import uuid4
 
 
@@ -56,7 +55,7 @@ class QSMTPServer():
                     return str(string)
 
             def smtp_EHLO(self, arg):
-                _q_s.logs.info(['servers', {'server': 'smtp_server', 'action': 'connection', 'ip': self.addr[0], 'port':self.addr[1]}])
+                _q_s.logs.info(ConnectionEvent('smtp_server', self.addr[0], self.addr[1]))
                 if not arg:
                     self.push('501 Syntax: HELO hostname')
                 if self._SMTPChannel__greeting:
@@ -79,11 +78,11 @@ class QSMTPServer():
                             username = _q_s.username
                             password = _q_s.password
                             status = 'success'
-                        _q_s.logs.info(['servers', {'server': 'smtp_server', 'action': 'login', 'status': status, 'ip': self.addr[0], 'port':self.addr[1], 'username':username, 'password':password}])
+                        _q_s.logs.info(LoginEvent('smtp_server', status, self.addr[0], self.addr[1], username, password))
 
                 except Exception as e:
                     print(e)
-                    _q_s.logs.error(['errors', {'server': 'smtp_server', 'error': 'smtp_AUTH', 'type': 'error -> ' + repr(e)}])
+                    _q_s.logs.error(ErrorEvent('smtp_server', 'smtp_AUTH', 'error -> ' + repr(e)))
 
                 self.push('235 Authentication successful')
 
@@ -117,11 +116,11 @@ class QSMTPServer():
                 run = True
 
             if run:
-                self.process = Popen(['python3', path.realpath(__file__), '--custom', '--ip', str(self.ip), '--port', str(self.port), '--username', str(self.username), '--password', str(self.password), '--mocking', str(self.mocking), '--config', str(self.config), '--uuid', str(self.uuid)])
+                self.process = spawn_server(self, self.smtp_server_main, ['python3', path.realpath(__file__), '--custom', '--ip', str(self.ip), '--port', str(self.port), '--username', str(self.username), '--password', str(self.password), '--mocking', str(self.mocking), '--config', str(self.config), '--uuid', str(self.uuid)])
                 if self.process.poll() is None and check_if_server_is_running(self.uuid):
                     status = 'success'
 
-            self.logs.info(['servers', {'server': 'smtp_server', 'action': 'process', 'status': status, 'ip': self.ip, 'port': self.port, 'username': self.username, 'password': self.password}])
+            self.logs.info(ProcessEvent('smtp_server', status, self.ip, self.port, self.username, self.password))
 
             if status == 'success':
                 return True
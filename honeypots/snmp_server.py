@@ -16,10 +16,9 @@ filterwarnings(action='ignore', module='.*OpenSSL.*')
 from twisted.internet.protocol import DatagramProtocol
 from twisted.internet import reactor
 from twisted.python import log as tlog
-from subprocess import Popen
 from os import path
-from scapy.all import SNMP
-from honeypots.helper import close_port_wrapper, get_free_port, kill_server_wrapper, server_arguments, setup_logger, disable_logger, set_local_vars, check_if_server_is_running
+from scapy.layers.snmp import SNMP
+from honeypots.helper import close_port_wrapper, get_free_port, kill_server_wrapper, server_arguments, spawn_server, setup_logger, disable_logger, set_local_vars, check_if_server_is_running, ConnectionEvent, QueryEvent, ProcessEvent
 from uuid import uuid4
 
 
@@ -43,9 +42,9 @@ class QSNMPServer():
         self.port = port or self.port or 161
         self.username = username or self.username or 'test'
         self.password = password or self.password or 'test'
-        disable_logger(1, tlog)
+        disable_logger(1, tlog, self.logs, 'snmp_server')
 
-    def snmp_server_main(self):
+    def snmp_server_main(self, run_reactor=True):
         _q_s = self
 
         class CustomDatagramProtocolProtocol(DatagramProtocol):
@@ -63,18 +62,19 @@ class QSNMPServer():
                 return version, community, oids
 
             def datagramReceived(self, data, addr):
-                _q_s.logs.info(['servers', {'server': 'snmp_server', 'action': 'connection', 'status': 'fail', 'ip': addr[0], 'port': addr[1]}])
+                _q_s.logs.info(ConnectionEvent('snmp_server', addr[0], addr[1], extra={'status': 'fail'}))
                 version, community, oids = self.parse_snmp(data)
                 if version or community or oids:
-                    _q_s.logs.info(['servers', {'server': 'snmp_server', 'action': 'query', 'status': 'success', 'ip': addr[0], 'port': addr[1], 'version': version, 'community': community, 'oids':oids}])
+                    _q_s.logs.info(QueryEvent('snmp_server', addr[0], addr[1], extra={'status': 'success', 'version': version, 'community': community, 'oids': oids}))
                     self.transport.write('Error', addr)
 
                 self.transport.loseConnection()
 
         reactor.listenUDP(port=self.port, protocol=CustomDatagramProtocolProtocol(), interface=self.ip)
-        reactor.run()
+        if run_reactor:
+            reactor.run()
 
-    def run_server(self, process=False, auto=False):
+    def run_server(self, process=False, auto=False, run_reactor=True):
         status = 'error'
         run = False
         if process:
@@ -87,11 +87,11 @@ class QSNMPServer():
                 run = True
 
             if run:
-                self.process = Popen(['python3', path.realpath(__file__), '--custom', '--ip', str(self.ip), '--port', str(self.port), '--mocking', str(self.mocking), '--config', str(self.config), '--uuid', str(self.uuid)])
+                self.process = spawn_server(self, self.snmp_server_main, ['python3', path.realpath(__file__), '--custom', '--ip', str(self.ip), '--port', str(self.port), '--mocking', str(self.mocking), '--config', str(self.config), '--uuid', str(self.uuid)])
                 if self.process.poll() is None and check_if_server_is_running(self.uuid):
                     status = 'success'
 
-            self.logs.info(['servers', {'server': 'snmp_server', 'action': 'process', 'status': status, 'ip': self.ip, 'port': self.port}])
+            self.logs.info(ProcessEvent('snmp_server', status, self.ip, self.port))
 
             if status == 'success':
                 return True
@@ -99,7 +99,7 @@ class QSNMPServer():
                 self.kill_server()
                 return False
         else:
-            self.snmp_server_main()
+            self.snmp_server_main(run_reactor)
 
     def close_port(self):
         ret = close_port_wrapper('snmp_server', self.ip, self.port, self.logs)
@@ -16,8 +16,7 @@ filterwarnings(action='ignore', module='.*OpenSSL.*')
 from socketserver import TCPServer, StreamRequestHandler, ThreadingMixIn
 from struct import unpack
 from os import path
-from subprocess import Popen
-from honeypots.helper import check_if_server_is_running, close_port_wrapper, get_free_port, kill_server_wrapper, server_arguments, set_local_vars, setup_logger
+from honeypots.helper import check_if_server_is_running, close_port_wrapper, get_free_port, kill_server_wrapper, server_arguments, spawn_server, set_local_vars, setup_logger, ConnectionEvent, LoginEvent, ProcessEvent
 from uuid import uuid4
 
 
@@ -54,7 +53,7 @@ class QSOCKS5Server():
                     return str(string)
 
             def handle(self):
-                _q_s.logs.info(['servers', {'server': 'socks5_server', 'action': 'connection', 'ip': self.client_address[0], 'port':self.client_address[1]}])
+                _q_s.logs.info(ConnectionEvent('socks5_server', self.client_address[0], self.client_address[1]))
                 v, m = unpack('!BB', self.connection.recv(2))
                 if v == 5:
                     if 2 in unpack('!' + 'B' * m, self.connection.recv(m)):
@@ -71,7 +70,7 @@ class QSOCKS5Server():
                                 username = _q_s.username
                                 password = _q_s.password
                                 status = 'success'
-                            _q_s.logs.info(['servers', {'server': 'socks5_server', 'action': 'login', 'status': status, 'ip': self.client_address[0], 'port':self.client_address[1], 'username':username, 'password':password}])
+                            _q_s.logs.info(LoginEvent('socks5_server', status, self.client_address[0], self.client_address[1], username, password))
 
                 self.server.close_request(self.request)
 
@@ -85,7 +84,7 @@ class QSOCKS5Server():
     def run_server(self, process=False, auto=False):
         if process:
             if self.close_port() and self.kill_server():
-                self.process = Popen(['python3', path.realpath(__file__), '--custom', '--ip', str(self.ip), '--port', str(self.port), '--username', str(self.username), '--password', str(self.password), '--mocking', str(self.mocking), '--config', str(self.config), '--uuid', str(self.uuid)])
+                self.process = spawn_server(self, self.socks5_server_main, ['python3', path.realpath(__file__), '--custom', '--ip', str(self.ip), '--port', str(self.port), '--username', str(self.username), '--password', str(self.password), '--mocking', str(self.mocking), '--config', str(self.config), '--uuid', str(self.uuid)])
         else:
             self.socks5_server_main()
 
@@ -102,11 +101,11 @@ class QSOCKS5Server():
                 run = True
 
             if run:
-                self.process = Popen(['python3', path.realpath(__file__), '--custom', '--ip', str(self.ip), '--port', str(self.port), '--username', str(self.username), '--password', str(self.password), '--mocking', str(self.mocking), '--config', str(self.config), '--uuid', str(self.uuid)])
+                self.process = spawn_server(self, self.socks5_server_main, ['python3', path.realpath(__file__), '--custom', '--ip', str(self.ip), '--port', str(self.port), '--username', str(self.username), '--password', str(self.password), '--mocking', str(self.mocking), '--config', str(self.config), '--uuid', str(self.uuid)])
                 if self.process.poll() is None and check_if_server_is_running(self.uuid):
                     status = 'success'
 
-            self.logs.info(['servers', {'server': 'socks5_server', 'action': 'process', 'status': status, 'ip': self.ip, 'port': self.port, 'username': self.username, 'password': self.password}])
+            self.logs.info(ProcessEvent('socks5_server', status, self.ip, self.port, self.username, self.password))
 
             if status == 'success':
                 return True
@@ -17,9 +17,8 @@ from twisted.conch.telnet import TelnetProtocol, TelnetTransport
 from twisted.internet.protocol import Factory
 from twisted.internet import reactor
 from twisted.python import log as tlog
-from subprocess import Popen
 from os import path
-from honeypots.helper import close_port_wrapper, get_free_port, kill_server_wrapper, server_arguments, setup_logger, disable_logger, set_local_vars, check_if_server_is_running
+from honeypots.helper import close_port_wrapper, get_free_port, kill_server_wrapper, server_arguments, spawn_server, setup_logger, disable_logger, set_local_vars, check_if_server_is_running, ConnectionEvent, LoginEvent, ProcessEvent, SessionFactory
 from uuid import uuid4
 
 
@@ -44,9 +43,9 @@ class QTelnetServer():
         self.port = port or self.port or 23
         self.username = username or self.username or 'test'
         self.password = password or self.password or 'test'
-        disable_logger(1, tlog)
+        disable_logger(1, tlog, self.logs, 'telnet_server')
 
-    def telent_server_main(self):
+    def telent_server_main(self, run_reactor=True):
         _q_s = self
 
         class CustomTelnetProtocol(TelnetProtocol):
@@ -66,7 +65,8 @@ class QTelnetServer():
                 self._pass = None
                 self.transport.write(b'PC login: ')
                 self._state = b'Username'
-                _q_s.logs.info(['servers', {'server': 'telnet_server', 'action': 'connection', 'ip': self.transport.getPeer().host, 'port': self.transport.getPeer().port}])
+                peer = self.transport.getPeer()
+                _q_s.logs.info(ConnectionEvent('telnet_server', peer.host, peer.port))
 
             def dataReceived(self, data):
                 data = data.strip()
@@ -83,7 +83,8 @@ class QTelnetServer():
                         username = _q_s.username
                         password = _q_s.password
                         status = 'success'
-                    _q_s.logs.info(['servers', {'server': 'telnet_server', 'action': 'login', 'status': status, 'ip': self.transport.getPeer().host, 'port': self.transport.getPeer().port, 'username': username, 'password': password}])
+                    peer = self.transport.getPeer()
+                    _q_s.logs.info(LoginEvent('telnet_server', status, peer.host, peer.port, username, password))
                     self.transport.loseConnection()
                 else:
                     self.transport.loseConnection()
@@ -95,10 +96,11 @@ class QTelnetServer():
 
         factory = Factory()
         factory.protocol = lambda: TelnetTransport(CustomTelnetProtocol)
-        reactor.listenTCP(port=self.port, factory=factory, interface=self.ip)
-        reactor.run()
+        reactor.listenTCP(port=self.port, factory=SessionFactory(factory, 'telnet_server', self.logs), interface=self.ip)
+        if run_reactor:
+            reactor.run()
 
-    def run_server(self, process=False, auto=False):
+    def run_server(self, process=False, auto=False, run_reactor=True):
         status = 'error'
         run = False
         if process:
@@ -111,11 +113,11 @@ class QTelnetServer():
                 run = True
 
             if run:
-                self.process = Popen(['python3', path.realpath(__file__), '--custom', '--ip', str(self.ip), '--port', str(self.port), '--username', str(self.username), '--password', str(self.password), '--mocking', str(self.mocking), '--config', str(self.config), '--uuid', str(self.uuid)])
+                self.process = spawn_server(self, self.telent_server_main, ['python3', path.realpath(__file__), '--custom', '--ip', str(self.ip), '--port', str(self.port), '--username', str(self.username), '--password', str(self.password), '--mocking', str(self.mocking), '--config', str(self.config), '--uuid', str(self.uuid)])
                 if self.process.poll() is None and check_if_server_is_running(self.uuid):
                     status = 'success'
 
-            self.logs.info(['servers', {'server': 'telnet_server', 'action': 'process', 'status': status, 'ip': self.ip, 'port': self.port, 'username': self.username, 'password': self.password}])
+            self.logs.info(ProcessEvent('telnet_server', status, self.ip, self.port, self.username, self.password))
 
             if status == 'success':
                 return True
@@ -123,7 +125,7 @@ class QTelnetServer():
                 self.kill_server()
                 return False
         else:
-            self.telent_server_main()
+            self.telent_server_main(run_reactor)
 
     def close_port(self):
         ret = close_port_wrapper('telnet_server', self.ip, self.port, self.logs)
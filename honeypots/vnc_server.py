@@ -18,10 +18,9 @@ from twisted.internet import reactor
 from Crypto.Cipher import DES
 from binascii import unhexlify
 from twisted.python import log as tlog
-from subprocess import Popen
 from os import path
 #from vncdotool import api as vncapi
-from honeypots.helper import close_port_wrapper, get_free_port, kill_server_wrapper, server_arguments, setup_logger, disable_logger, set_local_vars, check_if_server_is_running
+from honeypots.helper import close_port_wrapper, get_free_port, kill_server_wrapper, server_arguments, spawn_server, setup_logger, disable_logger, set_local_vars, check_if_server_is_running, ConnectionEvent, LoginEvent, ProcessEvent, SessionFactory
 from uuid import uuid4
 
 
@@ -52,7 +51,7 @@ class QVNCServer():
         self.port = port or self.port or 5900
         self.username = username or self.username or 'test'
         self.password = password or self.password or 'test'
-        disable_logger(1, tlog)
+        disable_logger(1, tlog, self.logs, 'vnc_server')
 
     def load_words(self,):
         with open(self.file_name, 'r') as file:
@@ -74,7 +73,7 @@ class QVNCServer():
 
         return None
 
-    def vnc_server_main(self):
+    def vnc_server_main(self, run_reactor=True):
         _q_s = self
 
         class CustomVNCProtocol(Protocol):
@@ -90,7 +89,8 @@ class QVNCServer():
             def connectionMade(self):
                 self.transport.write(b'RFB 003.008\n')
                 self._state = 1
-                _q_s.logs.info(['servers', {'server': 'vnc_server', 'action': 'connection', 'ip': self.transport.getPeer().host, 'port': self.transport.getPeer().port}])
+                peer = self.transport.getPeer()
+                _q_s.logs.info(ConnectionEvent('vnc_server', peer.host, peer.port))
 
             def dataReceived(self, data):
                 if self._state == 1:
@@ -113,7 +113,8 @@ class QVNCServer():
                             status = 'success'
                         else:
                             password = data.hex()
-                        _q_s.logs.info(['servers', {'server': 'vnc_server', 'action': 'login', status: 'failed', 'ip': self.transport.getPeer().host, 'port': self.transport.getPeer().port, 'username': username, 'password': password}])
+                        peer = self.transport.getPeer()
+                        _q_s.logs.info(LoginEvent('vnc_server', status, peer.host, peer.port, username, password))
                     except Exception as e:
                         print(e)
                     self.transport.loseConnection()
@@ -125,10 +126,11 @@ class QVNCServer():
 
         factory = Factory()
         factory.protocol = CustomVNCProtocol
-        reactor.listenTCP(port=self.port, factory=factory, interface=self.ip)
-        reactor.run()
+        reactor.listenTCP(port=self.port, factory=SessionFactory(factory, 'vnc_server', self.logs), interface=self.ip)
+        if run_reactor:
+            reactor.run()
 
-    def run_server(self, process=False, auto=False):
+    def run_server(self, process=False, auto=False, run_reactor=True):
         status = 'error'
         run = False
         if process:
@@ -141,11 +143,11 @@ class QVNCServer():
                 run = True
 
             if run:
-                self.process = Popen(['python3', path.realpath(__file__), '--custom', '--ip', str(self.ip), '--port', str(self.port), '--username', str(self.username), '--password', str(self.password), '--mocking', str(self.mocking), '--config', str(self.config), '--uuid', str(self.uuid)])
+                self.process = spawn_server(self, self.vnc_server_main, ['python3', path.realpath(__file__), '--custom', '--ip', str(self.ip), '--port', str(self.port), '--username', str(self.username), '--password', str(self.password), '--mocking', str(self.mocking), '--config', str(self.config), '--uuid', str(self.uuid)])
                 if self.process.poll() is None and check_if_server_is_running(self.uuid):
                     status = 'success'
 
-            self.logs.info(['servers', {'server': 'vnc_server', 'action': 'process', 'status': status, 'ip': self.ip, 'port': self.port, 'username': self.username, 'password': self.password}])
+            self.logs.info(ProcessEvent('vnc_server', status, self.ip, self.port, self.username, self.password))
 
             if status == 'success':
                 return True
@@ -153,7 +155,7 @@ class QVNCServer():
                 self.kill_server()
                 return False
         else:
-            self.vnc_server_main()
+            self.vnc_server_main(run_reactor)
 
     def close_port(self):
         ret = close_port_wrapper('vnc_server', self.ip, self.port, self.logs)